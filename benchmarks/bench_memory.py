@@ -0,0 +1,96 @@
+# Peak memory of a full build as the project grows. It isn't flat: every module is dropped once it's written, but the
+# manifest (see manifest.py) and the results transpile_folder returns keep one entry per module. That's linear growth of
+# about 1.1 KiB per module, 17 MiB for 100 modules and 28 MiB for 10000
+# Usage: python benchmarks/bench_memory.py [module counts...] (unix only, peak RSS comes from wait4)
+import os
+import sys
+import tempfile
+import subprocess
+
+repository = os.path.dirname(os.path.dirname(os.path.realpath(__file__)));
+
+counts = [int(count) for count in sys.argv[1:]] or [100, 1000, 10000];
+
+module_source = """
+def clamp(value: float, low: float, high: float) -> float:
+    if value < low:
+        return low
+    if value > high:
+        return high
+    return value
+
+def total_damage(hits: list[int], multiplier: float) -> float:
+    total = 0
+    for i in range(len(hits)):
+        total = total + clamp(hits[i] * multiplier, 0, 100)
+    return total
+
+names = ["sword", "bow", "staff", "module_%d"]
+stats = {"damage": %d, "speed": 1.5, "range": 10}
+squares = [x * x for x in range(20)]
+"""
+
+def make_project(folder: str, count: int):
+    os.makedirs(os.path.join(folder, "ropy", "shared"));
+    os.makedirs(os.path.join(folder, "src"));
+
+    for i in range(count):
+        # Spread over folders like a real project
+        module_folder = os.path.join(folder, "ropy", "shared", "group_" + str(i // 100));
+        os.makedirs(module_folder, exist_ok=True);
+
+        with open(os.path.join(module_folder, "module_" + str(i) + ".py"), "w") as f:
+            f.write(module_source % (i, i));
+
+def count_outputs(folder: str) -> int:
+    count = 0;
+
+    for root, dirs, files in os.walk(os.path.join(folder, "src")):
+        count += len([name for name in files if name.startswith("module_") and name.endswith(".lua")]);
+
+    return count;
+
+def build(folder: str) -> int:
+    # Peak RSS of a fresh interpreter doing the build, in KiB
+    process = subprocess.Popen([sys.executable, "-c",
+        "import sys; sys.path.insert(0, " + repr(repository) + ");" +
+        "from src.roblox_py.transpiler import transpiler; transpiler.transpile_folder('ropy', 'src')"
+    ], cwd=folder, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL);
+
+    pid, status, usage = os.wait4(process.pid, 0);
+    process.returncode = os.waitstatus_to_exitcode(status);
+
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss;
+
+def main():
+    baseline = None;
+    baseline_count = None;
+
+    print("modules".rjust(8) + "peak RSS".rjust(14) + "vs smallest".rjust(14) + "per module".rjust(14));
+
+    for count in counts:
+        with tempfile.TemporaryDirectory() as folder:
+            make_project(folder, count);
+            peak = build(folder);
+
+            # Every module has to have been written, otherwise we measured a build that stopped early
+            written = count_outputs(folder);
+
+            if written != count:
+                print("Error: only " + str(written) + " of " + str(count) + " modules were written");
+                sys.exit(1);
+
+        baseline = baseline or peak;
+        baseline_count = baseline_count or count;
+
+        # What every module past the smallest project costs
+        growth = (peak - baseline) / (count - baseline_count) if count != baseline_count else 0;
+
+        print(
+            str(count).rjust(8) + ("%.1f MiB" % (peak / 1024)).rjust(14) + ("%+.1f%%" % ((peak / baseline - 1) * 100)).rjust(14) +
+            ("%.2f KiB" % growth).rjust(14)
+        );
+
+if __name__ == "__main__":
+    main();
@@ -0,0 +1,77 @@
+# Measures how long the CLI takes before it gets to do any work
+# Usage: python benchmarks/bench_startup.py [runs]
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+
+repository = os.path.dirname(os.path.dirname(os.path.realpath(__file__)));
+
+runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20;
+
+def time_python(code: str, cwd: str | None = None) -> float:
+    # Best of "runs" fresh interpreters, in ms
+    command = [sys.executable, "-c", "import sys; sys.path.insert(0, " + repr(repository) + ");" + code];
+    best = None;
+
+    for _ in range(runs):
+        start = time.perf_counter();
+        subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL);
+        elapsed = (time.perf_counter() - start) * 1000;
+        best = elapsed if best is None else min(best, elapsed);
+
+    return best;
+
+def make_project(folder: str):
+    os.makedirs(os.path.join(folder, "ropy", "shared"));
+    os.makedirs(os.path.join(folder, "src"));
+
+    with open(os.path.join(folder, "ropy.json"), "w") as f:
+        json.dump({ "inDirectory": "ropy", "outDirectory": "src" }, f);
+
+    for i in range(200):
+        with open(os.path.join(folder, "ropy", "shared", "module_" + str(i) + ".py"), "w") as f:
+            f.write("x = " + str(i) + "\n");
+
+def run_main(folder: str) -> str:
+    # What the CLI prints for one run in folder
+    process = subprocess.run([sys.executable, "-c",
+        "import sys; sys.path.insert(0, " + repr(repository) + ");" +
+        "from src.roblox_py.main import main; main()"
+    ], cwd=folder, capture_output=True, text=True);
+
+    return process.stdout + process.stderr;
+
+def main():
+    results = {};
+
+    results["interpreter"] = time_python("pass");
+    results["import main"] = time_python("import src.roblox_py.main");
+    results["import transpiler"] = time_python("import src.roblox_py.transpiler.transpiler");
+
+    with tempfile.TemporaryDirectory() as folder:
+        make_project(folder);
+
+        # One real (untimed) build, so the stamp is exactly what main() checks
+        build = run_main(folder);
+
+        if "Successfully transpiled" not in build:
+            print("Error: the first build failed: " + build);
+            sys.exit(1);
+
+        # The timed runs must find nothing to do, otherwise we'd be measuring builds
+        if "Nothing changed" not in run_main(folder):
+            print("Error: main() didn't take the \"nothing changed\" path");
+            sys.exit(1);
+
+        results["no-op build (200 files)"] = time_python("from src.roblox_py.main import main; main()", folder);
+
+    for name in results:
+        print(name.ljust(28) + ("%.1f ms" % results[name]).rjust(10));
+
+    print("\nFor a per-module breakdown run: python -X importtime -c \"import src.roblox_py.main\"");
+
+if __name__ == "__main__":
+    main();
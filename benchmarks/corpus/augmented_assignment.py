@@ -0,0 +1,29 @@
+# +=, -=, //=, bitwise and string augmented assignment, with computed targets evaluated once
+calls = {"key": 0}
+
+def key(i):
+    calls["key"] += 1
+    return i % 4
+
+counts = {0: 0, 1: 0, 2: 0, 3: 0}
+total = 0
+for i in range(100000):
+    counts[key(i)] += 1
+    total += 3
+    total -= 1
+
+total //= 7
+flags = 0
+for i in range(32):
+    flags |= 1 << (i % 8)
+    flags ^= 3
+
+text = ""
+for i in range(5):
+    text += "ab"
+
+print(counts[0])
+print(calls["key"])
+print(total)
+print(flags)
+print(text)
@@ -0,0 +1,6 @@
+# List comprehensions, with and without a condition
+squares = [x * x for x in range(50000)]
+evens = [x for x in squares if x % 2 == 0]
+
+print(len(squares))
+print(len(evens))
@@ -0,0 +1,22 @@
+# Membership tests and lookups on literal tables inside loops, which are made once instead of per iteration
+states = {0: "idle", 1: "walk", 2: "run", 3: "jump"}
+
+moving = 0
+total = 0
+for i in range(200000):
+    state = states[i % 4]
+    if state in ("walk", "run", "jump"):
+        moving = moving + 1
+    speeds = {"idle": 0, "walk": 8, "run": 16, "jump": 12}
+    total = total + speeds[state]
+
+squares = 0
+n = 0
+while n < 1000:
+    for d in (1, 2, 3):
+        squares = squares + d * d
+    n = n + 1
+
+print(moving)
+print(total)
+print(squares)
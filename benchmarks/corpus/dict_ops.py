@@ -0,0 +1,11 @@
+# Membership tests, reads and writes on a dict
+counts = {}
+for i in range(100000):
+    key = i % 100
+    if key in counts:
+        counts[key] = counts[key] + 1
+    else:
+        counts[key] = 1
+
+print(len(counts))
+print(counts[5])
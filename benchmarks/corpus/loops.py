@@ -0,0 +1,21 @@
+# for over range, while and nested loops
+sevens = 0
+for i in range(210000):
+    if i % 7 == 0:
+        sevens = sevens + 1
+
+count = 0
+n = 0
+while n < 100000:
+    if n % 3 == 0:
+        count = count + 1
+    n = n + 1
+
+nested = 0
+for a in range(300):
+    for b in range(300):
+        nested = nested + 1
+
+print(sevens)
+print(count)
+print(nested)
@@ -0,0 +1,6 @@
+# Building a string one piece at a time
+text = ""
+for i in range(5000):
+    text = text + "ab"
+
+print(len(text))
@@ -0,0 +1,36 @@
+# Swaps, multiple return values and tuple unpacking in loops
+def step(x, v):
+    return x + v, v - 1
+
+def split(n):
+    return n // 10, n % 10
+
+a = 1
+b = 2
+for i in range(100001):
+    a, b = b, a
+
+x = 0
+v = 50
+for i in range(50):
+    x, v = step(x, v)
+
+digits = 0
+for i in range(10000):
+    tens, ones = split(i)
+    digits = digits + ones
+
+ages = {"a": 1, "b": 2, "c": 3}
+total = 0
+for name, age in ages.items():
+    total = total + age
+
+pairs_sum = 0
+for left, right in [(1, 2), (3, 4), (5, 6)]:
+    pairs_sum = pairs_sum + left * right
+
+print(a)
+print(x)
+print(digits)
+print(total)
+print(pairs_sum)
@@ -0,0 +1,177 @@
+# Runs every program in benchmarks/corpus under CPython and, transpiled, under a standalone Luau interpreter,
+# then compares what they print and how long they take. One program per construct, named after it.
+# Usage: python benchmarks/differential.py [--luau PATH] [--runs N] [--profile dev|release] [--json] [programs...]
+# Needs the luau CLI (https://github.com/luau-lang/luau/releases) on PATH or passed with --luau
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+repository = os.path.dirname(os.path.dirname(os.path.realpath(__file__)));
+sys.path.insert(0, repository);
+
+from src.roblox_py.transpiler import transpiler
+
+corpus_folder = os.path.join(repository, "benchmarks", "corpus");
+runtime_file = os.path.join(repository, "src", "roblox_py", "ropy_module.lua");
+
+# Stands in for the DataModel: the require at the top of every script asks game for the runtime module,
+# which the luau CLI loads from a path relative to the script instead
+prelude = "game = { FindFirstChild = function(self, name) return \"./\" .. name end }\n";
+
+def get_option(argv: list[str], name: str, default: str) -> str:
+    if name not in argv: return default;
+
+    position = argv.index(name);
+
+    if position + 1 == len(argv):
+        print("Error: " + name + " needs a value");
+        sys.exit(1);
+
+    value = argv[position + 1];
+    del argv[position:position + 2];
+
+    return value;
+
+def run(command: list[str], runs: int) -> dict:
+    # Best wall time of "runs" runs in ms, and what the first run printed
+    best = None;
+    output = None;
+
+    for _ in range(runs):
+        start = time.perf_counter();
+        process = subprocess.run(command, capture_output=True, text=True);
+        elapsed = (time.perf_counter() - start) * 1000;
+
+        if process.returncode != 0:
+            return { "time": None, "output": process.stdout, "error": process.stderr.strip() or "exit code " + str(process.returncode) };
+
+        best = elapsed if best is None else min(best, elapsed);
+        if output is None: output = process.stdout;
+
+    return { "time": best, "output": output, "error": None };
+
+def write_script(folder: str, name: str, source: str, settings: dict) -> dict:
+    # Transpiles source to <folder>/<name>.luau, next to the runtime
+    transpilation = transpiler.transpile_source(source, settings);
+
+    if transpilation["error"] is not None: return transpilation;
+
+    path = os.path.join(folder, name + ".luau");
+
+    with open(path, "w") as f:
+        f.write(prelude + transpilation["result"]);
+
+    return { "path": path, "error": None };
+
+def compare(program: str, folder: str, luau: str, runs: int, settings: dict, baselines: dict) -> dict:
+    name = os.path.splitext(os.path.basename(program))[0];
+
+    with open(program) as f:
+        source = f.read();
+
+    result = { "construct": name, "python": None, "luau": None, "slowdown": None, "status": "ok", "detail": "" };
+
+    python = run([sys.executable, program], runs);
+
+    if python["error"] is not None:
+        result["status"] = "python error";
+        result["detail"] = python["error"].splitlines()[-1];
+        return result;
+
+    script = write_script(folder, name, source, settings);
+
+    if script["error"] is not None:
+        result["status"] = "transpile error";
+        result["detail"] = script["error"].splitlines()[0];
+        return result;
+
+    lua = run([luau, script["path"]], runs);
+
+    if lua["error"] is not None:
+        result["status"] = "luau error";
+        result["detail"] = lua["error"].splitlines()[0];
+        return result;
+
+    # Without the time it takes to start either interpreter
+    result["python"] = max(python["time"] - baselines["python"], 0.01);
+    result["luau"] = max(lua["time"] - baselines["luau"], 0.01);
+    result["slowdown"] = result["luau"] / result["python"];
+
+    if lua["output"] != python["output"]:
+        result["status"] = "mismatch";
+        # The first line that differs
+        python_lines = python["output"].splitlines();
+        lua_lines = lua["output"].splitlines();
+
+        for i in range(max(len(python_lines), len(lua_lines))):
+            expected = python_lines[i] if i < len(python_lines) else "<nothing>";
+            got = lua_lines[i] if i < len(lua_lines) else "<nothing>";
+
+            if expected != got:
+                result["detail"] = "line " + str(i + 1) + ": expected " + expected + ", got " + got;
+                break;
+
+    return result;
+
+def format_time(value: float | None) -> str:
+    return "-" if value is None else "%.1f ms" % value;
+
+def main():
+    argv = sys.argv[1:];
+    luau = get_option(argv, "--luau", "luau");
+    runs = get_option(argv, "--runs", "3");
+
+    if not runs.isdigit() or int(runs) == 0:
+        print("Error: --runs must be a positive number");
+        sys.exit(1);
+
+    runs = int(runs);
+    profile = get_option(argv, "--profile", "dev");
+    as_json = "--json" in argv;
+    programs = [argument for argument in argv if argument != "--json"];
+
+    if shutil.which(luau) is None:
+        print("Error: no luau interpreter found at " + luau + ", pass one with --luau");
+        sys.exit(1);
+
+    if len(programs) == 0:
+        programs = [os.path.join(corpus_folder, name) for name in sorted(os.listdir(corpus_folder)) if name.endswith(".py")];
+
+    settings = { "profile": profile };
+    results = [];
+
+    with tempfile.TemporaryDirectory() as folder:
+        shutil.copyfile(runtime_file, os.path.join(folder, "ropy.luau"));
+
+        # What it costs to start each interpreter and load the runtime
+        empty = write_script(folder, "empty", "", settings);
+        baselines = {
+            "python": run([sys.executable, "-c", "pass"], runs)["time"],
+            "luau": run([luau, empty["path"]], runs)["time"],
+        };
+
+        for program in programs:
+            results.append(compare(program, folder, luau, runs, settings, baselines));
+
+    if as_json:
+        print(json.dumps({ "profile": profile, "results": results }, indent=2));
+        return 1 if any(result["status"] != "ok" for result in results) else 0;
+
+    print("construct".ljust(20) + "python".rjust(12) + "luau".rjust(12) + "slowdown".rjust(10) + "  status");
+
+    for result in results:
+        slowdown = "-" if result["slowdown"] is None else "%.2fx" % result["slowdown"];
+
+        print(
+            result["construct"].ljust(20) + format_time(result["python"]).rjust(12) + format_time(result["luau"]).rjust(12) +
+            slowdown.rjust(10) + "  " + result["status"] + ("  (" + result["detail"] + ")" if result["detail"] else "")
+        );
+
+    return 1 if any(result["status"] != "ok" for result in results) else 0;
+
+if __name__ == "__main__":
+    sys.exit(main());
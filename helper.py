@@ -1,3 +1,4 @@
+import sys
 from src.roblox_py.main import main
 
-main();
\ No newline at end of file
+sys.exit(main());
\ No newline at end of file
@@ -0,0 +1,308 @@
+# Long-lived build server for editors and git hooks
+# Keeps every transpiled module and the hash of every written output in memory and answers requests over a unix socket,
+# so a save only pays for the files that actually changed instead of a fresh interpreter and a full rebuild.
+#
+# Protocol: one JSON object per line in, one JSON object per line out
+#   { "command": "ping" }
+#   { "command": "compile", "paths": ["ropy/shared/main.py"] }    (no "paths" means the whole inDirectory, which also
+#       removes the outputs of sources that were deleted or renamed)
+#   { "command": "check", "path": "ropy/shared/main.py", "source": "..." }    (no "source" means read "path" from disk)
+#   { "command": "check" }    (every file in inDirectory, like "ropy --check")
+#   { "command": "shutdown" }
+#
+# Writes to outDirectory are serialised behind a single lock, checks never touch the disk and run in parallel.
+import os
+import json
+import socket
+import threading
+import socketserver
+
+from . import main as cli
+from .transpiler import transpiler
+from .util import manifest as manifest_util
+
+class ProjectState:
+    def __init__(self):
+        self.settings: dict = None;
+        self.settings_stamp: tuple = None;
+
+        # full_name -> { "stamp": (mtime, size), "result": str | None, "source_map": SourceMap | None, "error": str | None,
+        #   "diagnostics": list[dict] (see util/diagnostics.py), "source_hash": str | None }
+        self.modules: dict[str, dict] = {};
+        # destination file -> hash of what we last wrote to it
+        self.outputs: dict[str, str] = {};
+        self.runtime_installed = False;
+        # What's in ropy-manifest.json, read on the first compile
+        self.manifest: manifest_util.Manifest | None = None;
+
+        self.modules_lock = threading.Lock();
+        self.write_lock = threading.Lock();
+
+    def get_settings(self) -> dict:
+        stat = os.stat("ropy.json");
+        stamp = (stat.st_mtime_ns, stat.st_size);
+
+        # Only re-read ropy.json if it changed
+        if stamp != self.settings_stamp:
+            try:
+                settings = cli.get_settings();
+            except SystemExit:
+                raise ValueError("ropy.json is not valid");
+
+            # Different directories mean nothing we remember is valid anymore
+            if self.settings is not None and settings != self.settings:
+                with self.modules_lock:
+                    self.modules = {};
+                self.outputs = {};
+                self.runtime_installed = False;
+                self.manifest = manifest_util.Manifest();
+
+            self.settings = settings;
+            self.settings_stamp = stamp;
+
+        return self.settings;
+
+    def get_module(self, full_name: str) -> dict:
+        stat = os.stat(full_name);
+        stamp = (stat.st_mtime_ns, stat.st_size);
+
+        with self.modules_lock:
+            module = self.modules.get(full_name);
+
+        if module is not None and module["stamp"] == stamp: return module;
+
+        transpilation = transpile_safely(lambda: transpiler.transpile_file(full_name, self.settings));
+
+        module = {
+            "stamp": stamp,
+            "result": transpilation.get("result"),
+            "source_map": transpilation.get("source_map"),
+            "error": transpilation.get("error"),
+            "diagnostics": transpilation.get("diagnostics", []),
+            "source_hash": transpilation.get("source_hash")
+        };
+
+        with self.modules_lock:
+            self.modules[full_name] = module;
+
+        return module;
+
+    def get_paths(self) -> list[str]:
+        # Every source in inDirectory
+        paths = [];
+
+        for root, dirs, files in os.walk(self.settings["inDirectory"]):
+            for name in files:
+                if name.endswith(".py"): paths.append(os.path.join(root, name));
+
+        return paths;
+
+    def compile(self, paths: list[str] | None) -> dict:
+        with self.write_lock:
+            settings = self.get_settings();
+            folder_origin = settings["inDirectory"];
+            folder_destination = settings["outDirectory"];
+
+            whole_project = not paths;
+
+            if whole_project: paths = self.get_paths();
+
+            # ropy/../ropy/main.py is ropy/main.py, for get_destination_path as well as the manifest
+            paths = [os.path.normpath(path) for path in paths];
+
+            errors = {};
+            diagnostics = [];
+            written = [];
+            removed = [];
+            module_folder = "";
+
+            if self.manifest is None: self.manifest = manifest_util.Manifest.read();
+
+            self.manifest.build = manifest_util.get_build_key(settings);
+
+            for full_name in paths:
+                if not os.path.isfile(full_name):
+                    errors[full_name] = full_name + " is not a valid path";
+                    diagnostics.append({ "message": errors[full_name], "severity": "error", "file": full_name });
+                    continue;
+
+                # Its output would end up outside of outDirectory
+                if not is_inside(full_name, folder_origin) or not full_name.endswith(".py"):
+                    errors[full_name] = full_name + " is not a Python file in " + folder_origin;
+                    diagnostics.append({ "message": errors[full_name], "severity": "error", "file": full_name });
+                    continue;
+
+                module = self.get_module(full_name);
+                diagnostics.extend(module["diagnostics"]);
+
+                if module["error"] is not None:
+                    errors[full_name] = module["error"];
+                    continue;
+
+                new_file_name = transpiler.get_destination_path(full_name, folder_origin, folder_destination);
+
+                # Hashing what we'd write is the same as hashing what's on disk
+                digest = manifest_util.OutputDigest();
+                digest.update(module["result"]);
+                content_hash = digest.hasher.hexdigest();
+
+                self.manifest.add(full_name, new_file_name, digest, module["source_hash"]);
+
+                if transpiler.is_module_script(new_file_name):
+                    module_folder = os.path.dirname(new_file_name);
+
+                # Skip outputs that are already on disk
+                if self.outputs.get(new_file_name) == content_hash and os.path.isfile(new_file_name): continue;
+
+                transpiler.write_file(new_file_name, module["result"]);
+
+                if module["source_map"] is not None:
+                    transpiler.write_source_map(full_name, new_file_name, module["source_map"]);
+
+                self.outputs[new_file_name] = content_hash;
+                written.append(new_file_name);
+
+            if whole_project: removed = self.remove_stale_outputs(paths);
+
+            if not self.runtime_installed and module_folder != "":
+                runtime = transpiler.install_runtime(module_folder);
+                self.manifest.set_runtime(runtime["output"], runtime["sha1"], runtime["size"]);
+                self.runtime_installed = True;
+
+            self.manifest.write();
+
+            return { "compiled": len(paths), "written": written, "removed": removed, "errors": errors, "diagnostics": diagnostics };
+
+    def remove_stale_outputs(self, paths: list[str]) -> list[str]:
+        # Deletes what the manifest lists for sources that aren't in paths anymore, returns the outputs that went away
+        sources = set(manifest_util.get_relative_path(path) for path in paths);
+        removed = [];
+
+        for source in list(self.manifest.files):
+            if source in sources: continue;
+
+            output = self.manifest.files[source]["output"];
+
+            for file_name in [output, output + ".map"]:
+                if os.path.isfile(file_name): os.remove(file_name);
+
+            self.manifest.remove(source);
+            self.outputs.pop(os.path.abspath(output), None);
+            removed.append(output);
+
+        with self.modules_lock:
+            for full_name in list(self.modules):
+                if not os.path.isfile(full_name): del self.modules[full_name];
+
+        return removed;
+
+    def check(self, path: str | None, source: str | None) -> dict:
+        # Reloading ropy.json can reset the state a compile is using
+        with self.write_lock:
+            self.get_settings();
+
+        # The whole project, from what we already transpiled wherever it's still up to date
+        if path is None and source is None:
+            errors = {};
+            diagnostics = [];
+            paths = self.get_paths();
+
+            for full_name in paths:
+                module = self.get_module(full_name);
+                diagnostics.extend(module["diagnostics"]);
+
+                if module["error"] is not None: errors[full_name] = module["error"];
+
+            return { "checked": len(paths), "errors": errors, "diagnostics": diagnostics };
+
+        if source is None:
+            module = self.get_module(path);
+            return { "error": module["error"], "diagnostics": module["diagnostics"] };
+
+        transpilation = transpile_safely(lambda: transpiler.transpile_source(source, self.settings, path));
+
+        return { "error": transpilation.get("error"), "diagnostics": transpilation.get("diagnostics", []) };
+
+def is_inside(path: str, folder: str) -> bool:
+    folder = os.path.abspath(folder);
+
+    return os.path.commonpath([folder, os.path.abspath(path)]) == folder;
+
+def transpile_safely(transpile) -> dict:
+    # Unsupported constructs end up in the diagnostics, this is for anything that still gets past them (e.g. a bad file)
+    try:
+        return transpile();
+    except Exception as e:
+        return { "error": "Internal error: " + str(e), "diagnostics": [{ "message": "internal error: " + str(e), "severity": "error" }] };
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip() == b"": continue;
+
+            try:
+                request = json.loads(line);
+                response = self.server.dispatch(request);
+            except Exception as e:
+                request = None;
+                response = { "error": str(e) };
+
+            self.wfile.write((json.dumps(response) + "\n").encode());
+            self.wfile.flush();
+
+            # Only once the answer is out: serve() exits as soon as serve_forever() returns, taking this thread with it.
+            # shutdown() blocks until serve_forever() returns, which can't happen while we're inside it
+            if isinstance(request, dict) and request.get("command") == "shutdown":
+                threading.Thread(target=self.server.shutdown).start();
+                return;
+
+# Windows builds of Python don't have unix sockets, serve() reports that instead of failing on import
+UnixStreamServer = getattr(socketserver, "UnixStreamServer", socketserver.TCPServer);
+
+class DaemonServer(socketserver.ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True;
+
+    def __init__(self, path: str):
+        self.state = ProjectState();
+        UnixStreamServer.__init__(self, path, RequestHandler);
+
+    def dispatch(self, request: dict) -> dict:
+        command = request.get("command");
+
+        if command == "ping":
+            return { "ok": True };
+
+        if command == "compile":
+            return self.state.compile(request.get("paths"));
+
+        if command == "check":
+            return self.state.check(request.get("path"), request.get("source"));
+
+        # RequestHandler stops the server once it has answered
+        if command == "shutdown":
+            return { "ok": True };
+
+        return { "error": "Unknown command " + str(command) };
+
+def serve(path: str = cli.daemon_socket_file):
+    if not hasattr(socket, "AF_UNIX"):
+        print("Error: the build daemon needs unix domain sockets, which this platform does not support");
+        exit();
+
+    # A socket left behind by a daemon that didn't shut down cleanly
+    if os.path.exists(path):
+        if cli.request_daemon({ "command": "ping" }, path) is not None:
+            print("Error: a build daemon is already running on " + path);
+            exit();
+        os.remove(path);
+
+    server = DaemonServer(path);
+    print("Build daemon listening on " + path);
+
+    try:
+        server.serve_forever();
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close();
+        if os.path.exists(path): os.remove(path);
@@ -1,16 +1,29 @@
-from ..roblox_py.transpiler import transpiler
+# Keep the imports here cheap: this module is loaded on every CLI invocation (pre-commit hooks, editor saves)
+# and the transpiler is only imported once we know there is actually something to build
 import os
+import sys
 import json
+import re
 import time
+import hashlib
 
 settings = {};
 
+# Remembers what the last successful build was made from, next to ropy.json
+stamp_file = ".ropy-cache";
+
+# Where a running build daemon listens (see daemon.py)
+daemon_socket_file = ".ropy.sock";
+
+# What the "directives" setting accepts, each one is emitted as --!<directive> at the top of the script
+luau_directives = ["strict", "nonstrict", "nocheck", "native", "optimize 0", "optimize 1", "optimize 2"];
+
 def get_settings():
     # Check if the current folder has a "ropy.json" file in it
     if not os.path.isfile("ropy.json"):
         print("Error: ropy.json not found in " + os.getcwd());
         exit();
-    
+
     # Read the file
     file = open("ropy.json");
     settings = file.read();
@@ -26,10 +39,55 @@ def get_settings():
 
     # Reject any foreign settings
     for setting in settings:
-        if setting not in ["outDirectory", "inDirectory"]:
+        if setting not in ["outDirectory", "inDirectory", "sourceMaps", "profile", "streaming", "directives", "builtins"]:
             print("Error: " + setting + " is not a valid setting");
             exit();
 
+    if "sourceMaps" in settings and not isinstance(settings["sourceMaps"], bool):
+        print("Error: sourceMaps must be true or false");
+        exit();
+
+    if "streaming" in settings and not isinstance(settings["streaming"], bool):
+        print("Error: streaming must be true or false");
+        exit();
+
+    if "profile" in settings and settings["profile"] not in ["dev", "release"]:
+        print("Error: profile must be either \"dev\" or \"release\"");
+        exit();
+
+    if "directives" in settings:
+        # { "<glob relative to inDirectory>": ["strict", "native", ...] }
+        if not isinstance(settings["directives"], dict):
+            print("Error: directives must map file patterns to lists of directives");
+            exit();
+
+        for pattern in settings["directives"]:
+            directives = settings["directives"][pattern];
+
+            if not isinstance(directives, list):
+                print("Error: directives for " + pattern + " must be a list");
+                exit();
+
+            for directive in directives:
+                if directive not in luau_directives:
+                    print("Error: " + str(directive) + " is not a valid directive, use one of " + ", ".join(luau_directives));
+                    exit();
+
+    if "builtins" in settings:
+        # { "wait": "task.wait", "http.get": "game:GetService(\"HttpService\"):GetAsync", ... }, see util/builtins.py
+        if not isinstance(settings["builtins"], dict):
+            print("Error: builtins must map Python names to Luau functions");
+            exit();
+
+        for name in settings["builtins"]:
+            if not re.fullmatch("[A-Za-z_][A-Za-z0-9_]*(\\.[A-Za-z_][A-Za-z0-9_]*)?", name):
+                print("Error: " + name + " is not a valid builtin, use \"name\" or \"receiver.method\"");
+                exit();
+
+            if not isinstance(settings["builtins"][name], str) or settings["builtins"][name] == "":
+                print("Error: builtin " + name + " must map to a Luau function");
+                exit();
+
     # Check if settings["outDirectory"] and settings["inDirectory"] is a valid directory
     if not os.path.isdir(settings["inDirectory"]):
         print("Error: " + settings["inDirectory"] + " is not a valid directory");
@@ -38,32 +96,218 @@ def get_settings():
     if not os.path.isdir(settings["outDirectory"]):
         print("Error: " + settings["outDirectory"] + " is not a valid directory");
         exit();
-    
+
     return settings;
 
-def transpile(folderOrigin: str, folderDestination: str):
+def add_tree(hasher, folder: str, suffixes: tuple[str, ...] | None = None):
+    # The (path, mtime, size) of every file in folder, or only of those ending with one of suffixes
+    for root, dirs, files in os.walk(folder):
+        # os.walk order is filesystem dependent
+        dirs.sort();
+
+        for name in sorted(files):
+            if suffixes is not None and not name.endswith(suffixes): continue;
+
+            full_name = os.path.join(root, name);
+            stat = os.stat(full_name);
+
+            hasher.update((full_name + "\0" + str(stat.st_mtime_ns) + "\0" + str(stat.st_size) + "\n").encode());
+
+def get_fingerprint(settings: dict) -> str:
+    # Hash everything a build depends on without reading any file contents:
+    # the settings, the compiler's own files and the (path, mtime, size) of every source file
+    hasher = hashlib.sha1();
+    hasher.update(json.dumps(settings, sort_keys=True).encode());
+
+    add_tree(hasher, os.path.dirname(os.path.realpath(__file__)), (".py", ".lua"));
+    add_tree(hasher, settings["inDirectory"], (".py", ".lua"));
+
+    return hasher.hexdigest();
+
+def get_output_fingerprint(settings: dict) -> str:
+    # Same for what the build wrote, so deleting or editing the outputs (or the manifest) makes the next run build again
+    from .util import manifest as manifest_util
+
+    hasher = hashlib.sha1();
+    add_tree(hasher, settings["outDirectory"]);
+
+    if os.path.isfile(manifest_util.manifest_file):
+        stat = os.stat(manifest_util.manifest_file);
+        hasher.update((str(stat.st_mtime_ns) + "\0" + str(stat.st_size)).encode());
+
+    return hasher.hexdigest();
+
+def is_up_to_date(fingerprint: str) -> bool:
+    if not os.path.isfile(stamp_file): return False;
+
+    with open(stamp_file) as f:
+        return f.read().strip() == fingerprint;
+
+def write_stamp(fingerprint: str):
+    with open(stamp_file, "w") as f:
+        f.write(fingerprint);
+
+def request_daemon(request: dict, path: str = daemon_socket_file) -> dict | None:
+    # Returns None if there is no daemon to talk to
+    if not os.path.exists(path): return None;
+
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"): return None;
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(path);
+            connection.sendall((json.dumps(request) + "\n").encode());
+
+            with connection.makefile("rb") as response:
+                return json.loads(response.readline());
+    except (OSError, ValueError):
+        return None;
+
+def report_diagnostics(diagnostics: list[dict], as_json: bool = False) -> None:
+    # Every problem of the build at once, "file:line:column: error: message" per line or one JSON document with --json
+    from .util import diagnostics as diagnostics_util
+
+    collected = diagnostics_util.Diagnostics();
+    collected.extend(diagnostics);
+
+    if as_json:
+        print(collected.to_json());
+        return;
+
+    if len(collected.items) == 0: return;
+
+    print(collected.format());
+
+    files = set(diagnostic.file for diagnostic in collected.items);
+    print("Error: " + str(len(collected.items)) + " problem(s) in " + str(len(files)) + " file(s)");
+
+def transpile_with_daemon(as_json: bool = False) -> bool | None:
+    start_time = int(round(time.time() * 1000))
+
+    response = request_daemon({ "command": "compile" });
+
+    if response is None: return None;
+
+    if "error" in response:
+        print("Error: " + response["error"]);
+        return False
+
+    report_diagnostics(response["diagnostics"], as_json);
+
+    if len(response["errors"]) > 0: return False
+
+    if not as_json:
+        print("Successfully transpiled " + str(response["compiled"]) + " files (" + str(len(response["written"])) + " of which changed) in " + str(int(round(time.time() * 1000)) - start_time) + " ms");
+
+    return True
+
+def check_with_daemon(as_json: bool = False) -> bool | None:
+    start_time = int(round(time.time() * 1000))
+
+    response = request_daemon({ "command": "check" });
+
+    if response is None: return None;
+
+    if "error" in response:
+        print("Error: " + response["error"]);
+        return False
+
+    report_diagnostics(response["diagnostics"], as_json);
+
+    if len(response["errors"]) > 0: return False
+
+    if not as_json:
+        print("Checked " + str(response["checked"]) + " files in " + str(int(round(time.time() * 1000)) - start_time) + " ms, no problems found");
+
+    return True
+
+def check(folderOrigin: str, settings: dict | None = None, as_json: bool = False) -> bool:
+    # Like transpile, but nothing is written: outDirectory, the runtime, the manifest and the cache stay as they are
+    from .transpiler import transpiler
+
     start_time = int(round(time.time() * 1000))
 
-    transpilations = transpiler.transpile_folder(folderOrigin, folderDestination)
+    checks = transpiler.check_folder(folderOrigin, settings);
+
+    report_diagnostics(checks["diagnostics"], as_json);
+
+    if len(checks["errors"]) > 0: return False
+
+    if not as_json:
+        print("Checked " + str(checks["checked"]) + " files (" + str(checks["cached"]) + " of which were unchanged since the last build) in " + str(int(round(time.time() * 1000)) - start_time) + " ms, no problems found");
+
+    return True
+
+def transpile(folderOrigin: str, folderDestination: str, settings: dict | None = None, as_json: bool = False) -> bool:
+    from .transpiler import transpiler
+
+    start_time = int(round(time.time() * 1000))
+
+    transpilations = transpiler.transpile_folder(folderOrigin, folderDestination, settings)
 
     transpilation_results = transpilations["results"];
     transpilation_errors = transpilations["errors"];
 
-    if len(transpilation_errors) > 0:
-        print("Error:")
-        for error in transpilation_errors:
-            print(error)
-        return
-    
+    # The other files were still built, but the build as a whole failed
+    report_diagnostics(transpilations["diagnostics"], as_json);
+
+    if len(transpilation_errors) > 0: return False
+
     empty = 0;
 
     for file in transpilation_results:
-        if transpilation_results[file] == "" or transpilation_results[file] == None:
+        # An empty output, or an output length of 0 when streaming
+        if not transpilation_results[file]:
             empty += 1;
             continue;
 
-    print("Successfully transpiled " + str(len(transpilation_results)) + " files (" + str(empty) + " of which were empty) in " + str(int(round(time.time() * 1000)) - start_time) + " ms");
+    if not as_json:
+        print("Successfully transpiled " + str(len(transpilation_results)) + " files (" + str(empty) + " of which were empty) in " + str(int(round(time.time() * 1000)) - start_time) + " ms");
+
+    return True
+
+def main(argv: list[str] | None = None):
+    if argv is None: argv = sys.argv[1:];
+
+    force = "--force" in argv;
+    # Report diagnostics as JSON on stdout, for editors and CI
+    as_json = "--json" in argv;
+    # Only report problems, for pre-commit hooks and editors
+    check_only = "--check" in argv;
+
+    if "--daemon" in argv:
+        from . import daemon
+        daemon.serve();
+        return;
 
-def main():
     settings = get_settings();
-    transpile(settings["inDirectory"], settings["outDirectory"]);
\ No newline at end of file
+
+    fingerprint = get_fingerprint(settings);
+
+    # Nothing changed since the last successful build, so don't even load the transpiler
+    if not force and is_up_to_date(fingerprint + get_output_fingerprint(settings)):
+        if as_json: report_diagnostics([], True);
+        else: print("Nothing changed since the last build");
+        return;
+
+    if check_only:
+        success = check_with_daemon(as_json);
+
+        if success is None:
+            success = check(settings["inDirectory"], settings, as_json);
+
+        return None if success else 1;
+
+    # Prefer a running daemon, it only rebuilds what changed
+    success = transpile_with_daemon(as_json);
+
+    if success is None:
+        success = transpile(settings["inDirectory"], settings["outDirectory"], settings, as_json);
+
+    if not success:
+        return 1;
+
+    # The sources as they were when the build started, the outputs as the build left them
+    write_stamp(fingerprint + get_output_fingerprint(settings));
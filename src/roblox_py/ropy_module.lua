@@ -19,6 +19,40 @@ ropy.operator_in = function(needle, haystack)
 	return false
 end
 
+-- Python truthiness: None, False, 0, "" and empty containers are falsy
+-- The transpiler inlines everything but the table check for plain variables, see transpile_condition
+ropy.truthy = function(value)
+	if not value or value == 0 or value == "" then
+		return false
+	end
+
+	-- Tables with a metatable are class instances, which are always truthy
+	if type(value) == "table" and getmetatable(value) == nil then
+		return next(value) ~= nil
+	end
+
+	return true
+end
+
+-- Functions that return tuples return several values, see transpile_return.
+-- Kept in a single value they become a table again, unless the function returned None
+ropy.pack = function(...)
+	if select("#", ...) <= 1 and (...) == nil then
+		return nil
+	end
+
+	return { ... }
+end
+
+-- "return pair" in a function that returns several values
+ropy.unpack = function(tuple)
+	if tuple == nil then
+		return nil
+	end
+
+	return table.unpack(tuple)
+end
+
 ropy.range = function(start, stop, step)
 	if stop == nil then stop = start; start = 1 end
 	if step == nil then step = 1 end
@@ -116,10 +150,8 @@ ropy.set.tuple = ropy.set.list
 
 ropy.all = {
 	dict = function(pytable)
-		if #pytable == 0 then return true end
-		
 		for k, _ in pairs(pytable) do
-			if not k or k == 0 or (type(k)=="string" and #k==0) then
+			if not ropy.truthy(k) then
 				return false
 			end
 		end
@@ -127,10 +159,8 @@ ropy.all = {
 	end,
 
 	list = function(pytable)
-		if #pytable == 0 then return true end
-
 		for _, v in pairs(pytable) do
-			if not v or v == 0 or (type(v)=="string" and #v==0) then
+			if not ropy.truthy(v) then
 				return false
 			end
 		end
@@ -141,4 +171,441 @@ ropy.all = {
 ropy.all.tuple = ropy.all.list
 ropy.all.set = ropy.all.list
 
+-- == Bulk helpers begin here == --
+-- Lists are plain arrays, so these use numeric loops rather than pairs().
+-- The transpiler turns "for ... in enumerate/range/zip/map/filter(...)" into plain loops, these are for every other use
+
+-- Iterating a dict in Python gives its keys
+local function as_list(pytable)
+	if #pytable > 0 or next(pytable) == nil then
+		return pytable
+	end
+
+	local result = {}
+	for k in pairs(pytable) do
+		table.insert(result, k)
+	end
+	return result
+end
+
+ropy.sum = function(pytable, start)
+	local list = as_list(pytable)
+	local result = start or 0
+
+	for i = 1, #list do
+		result = result + list[i]
+	end
+
+	return result
+end
+
+-- min(list, key, default), the transpiler uses ropy.min_of for min(a, b, ...)
+ropy.min = function(pytable, key, default)
+	local list = as_list(pytable)
+	local length = #list
+
+	if length == 0 then
+		if default ~= nil then return default end
+		error("min() arg is an empty sequence")
+	end
+
+	local result = list[1]
+
+	if key == nil then
+		for i = 2, length do
+			if list[i] < result then
+				result = list[i]
+			end
+		end
+		return result
+	end
+
+	-- key is called once per element
+	local result_key = key(result)
+	for i = 2, length do
+		local value_key = key(list[i])
+		if value_key < result_key then
+			result, result_key = list[i], value_key
+		end
+	end
+	return result
+end
+
+ropy.max = function(pytable, key, default)
+	local list = as_list(pytable)
+	local length = #list
+
+	if length == 0 then
+		if default ~= nil then return default end
+		error("max() arg is an empty sequence")
+	end
+
+	local result = list[1]
+
+	if key == nil then
+		for i = 2, length do
+			if list[i] > result then
+				result = list[i]
+			end
+		end
+		return result
+	end
+
+	local result_key = key(result)
+	for i = 2, length do
+		local value_key = key(list[i])
+		if value_key > result_key then
+			result, result_key = list[i], value_key
+		end
+	end
+	return result
+end
+
+-- min(a, b, ...) without building a table
+ropy.min_of = function(result, ...)
+	for i = 1, select("#", ...) do
+		local value = select(i, ...)
+		if value < result then
+			result = value
+		end
+	end
+	return result
+end
+
+ropy.max_of = function(result, ...)
+	for i = 1, select("#", ...) do
+		local value = select(i, ...)
+		if value > result then
+			result = value
+		end
+	end
+	return result
+end
+
+ropy.sorted = function(pytable, key, reverse)
+	local list = as_list(pytable)
+	local length = #list
+
+	if key == nil then
+		local result = table.create(length)
+		for i = 1, length do
+			result[i] = list[i]
+		end
+
+		if reverse then
+			table.sort(result, function(a, b) return a > b end)
+		else
+			table.sort(result)
+		end
+		return result
+	end
+
+	-- Call key once per element, then sort positions: comparing positions on ties keeps the sort stable like Python's
+	local keys = table.create(length)
+	local order = table.create(length)
+	for i = 1, length do
+		keys[i] = key(list[i])
+		order[i] = i
+	end
+
+	if reverse then
+		table.sort(order, function(a, b)
+			local key_a, key_b = keys[a], keys[b]
+			if key_a == key_b then return a < b end
+			return key_a > key_b
+		end)
+	else
+		table.sort(order, function(a, b)
+			local key_a, key_b = keys[a], keys[b]
+			if key_a == key_b then return a < b end
+			return key_a < key_b
+		end)
+	end
+
+	local result = table.create(length)
+	for i = 1, length do
+		result[i] = list[order[i]]
+	end
+	return result
+end
+
+ropy.zip = function(...)
+	local lists = { ... }
+	local count = select("#", ...)
+
+	if count == 0 then return {} end
+
+	-- Stops at the shortest list
+	local length = math.huge
+	for j = 1, count do
+		lists[j] = as_list(lists[j])
+		length = math.min(length, #lists[j])
+	end
+
+	local result = table.create(length)
+	for i = 1, length do
+		local row = table.create(count)
+		for j = 1, count do
+			row[j] = lists[j][i]
+		end
+		result[i] = row
+	end
+	return result
+end
+
+-- Like ropy.range, indices are 1 based unless told otherwise so they can index lists directly
+ropy.enumerate = function(pytable, start)
+	local list = as_list(pytable)
+	local offset = (start or 1) - 1
+	local result = table.create(#list)
+
+	for i = 1, #list do
+		result[i] = { i + offset, list[i] }
+	end
+	return result
+end
+
+ropy.map = function(func, pytable, ...)
+	if select("#", ...) > 0 then
+		-- map(f, a, b) calls f(a[i], b[i])
+		local result = {}
+		for i, row in ipairs(ropy.zip(pytable, ...)) do
+			result[i] = func(table.unpack(row))
+		end
+		return result
+	end
+
+	local list = as_list(pytable)
+	local result = table.create(#list)
+
+	for i = 1, #list do
+		result[i] = func(list[i])
+	end
+	return result
+end
+
+-- filter(nil, list) keeps the truthy values
+ropy.filter = function(func, pytable)
+	local list = as_list(pytable)
+	local result = {}
+	local length = 0
+
+	for i = 1, #list do
+		local value = list[i]
+		local keep
+
+		if func == nil then
+			keep = ropy.truthy(value)
+		else
+			keep = ropy.truthy(func(value))
+		end
+
+		if keep then
+			length = length + 1
+			result[length] = value
+		end
+	end
+	return result
+end
+
+-- == Async begins here == --
+-- "async def" functions return a task when called, which runs as its own coroutine once it is awaited, gathered,
+-- passed to asyncio.create_task or asyncio.run. Like in Python, nothing runs before that.
+-- Tasks are resumed through Roblox's task library (task.spawn/task.defer), so task.wait, events and
+-- HTTP requests inside an async function only suspend that function.
+
+local Task = {}
+Task.__index = Task
+
+local function is_task(value)
+	return type(value) == "table" and getmetatable(value) == Task
+end
+
+-- Runs the task until it first yields, the rest happens on the task scheduler
+local function start_task(pytask, deferred)
+	if pytask.started then return end
+	pytask.started = true
+
+	if deferred then
+		task.defer(pytask.thread)
+	else
+		task.spawn(pytask.thread)
+	end
+end
+
+ropy.async = function(func)
+	return function(...)
+		local args = table.pack(...)
+		local pytask = setmetatable({ started = false, done = false, ok = true, value = nil, results = nil, waiting = {} }, Task)
+
+		pytask.thread = coroutine.create(function()
+			-- Every value the function returns, not just the first one
+			local results = table.pack(pcall(func, table.unpack(args, 1, args.n)))
+			pytask.done, pytask.ok, pytask.value, pytask.results = true, results[1], results[2], results
+
+			-- Wake up everything that awaited us, after we're done rather than inside our own resumption
+			for _, waiter in ipairs(pytask.waiting) do
+				task.defer(waiter)
+			end
+			pytask.waiting = nil
+		end)
+
+		return pytask
+	end
+end
+
+-- await x, anything that isn't a task (e.g. the result of a normal function) is returned as is
+ropy.await = function(awaitable)
+	if not is_task(awaitable) then
+		return awaitable
+	end
+
+	start_task(awaitable, false)
+
+	if not awaitable.done then
+		local thread = coroutine.running()
+		table.insert(awaitable.waiting, thread)
+		coroutine.yield()
+	end
+
+	if not awaitable.ok then
+		error(awaitable.value, 0)
+	end
+
+	return table.unpack(awaitable.results, 2, awaitable.results.n)
+end
+
+ropy.asyncio = {}
+
+ropy.asyncio.sleep = ropy.async(function(seconds)
+	task.wait(seconds or 0)
+end)
+
+-- Starts every awaitable before waiting on any of them, so they run at the same time
+ropy.asyncio.gather = ropy.async(function(...)
+	local awaitables = table.pack(...)
+	local result = {}
+
+	for i = 1, awaitables.n do
+		if is_task(awaitables[i]) then
+			start_task(awaitables[i], false)
+		end
+	end
+
+	for i = 1, awaitables.n do
+		result[i] = ropy.await(awaitables[i])
+	end
+
+	return result
+end)
+
+ropy.asyncio.create_task = function(pytask)
+	start_task(pytask, true)
+	return pytask
+end
+
+-- Scripts can yield, so running the main task is just awaiting it from the script's own thread
+ropy.asyncio.run = function(pytask)
+	return ropy.await(pytask)
+end
+
+-- == Source maps begin here == --
+
+-- Maps line numbers in error messages back to the Python source, using the "mappings" of the .lua.map files
+-- that are written next to every script when "sourceMaps" is enabled in ropy.json.
+-- The maps are not part of the game, so pass them in yourself, e.g. from a server-only ModuleScript or your error logger:
+-- ropy.sourcemap.traceback(message, { ["ServerScriptService.main"] = "AAAA;AACA;..." })
+
+local base64_values = {}
+for i = 1, 64 do
+	base64_values[string.sub("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/", i, i)] = i - 1
+end
+
+ropy.sourcemap = {}
+
+-- "mappings" -> { [lua line] = python line }, both 1 based
+ropy.sourcemap.decode = function(mappings)
+	local result = {}
+	local generated_line = 1
+	local source_line = 0
+
+	for group in string.gmatch(mappings .. ";", "([^;]*);") do
+		for segment in string.gmatch(group, "[^,]+") do
+			local values = {}
+			local value, shift = 0, 0
+
+			for i = 1, #segment do
+				local digit = base64_values[string.sub(segment, i, i)]
+				value = value + bit32.lshift(bit32.band(digit, 31), shift)
+
+				if bit32.band(digit, 32) == 0 then
+					-- Lowest bit is the sign
+					local magnitude = bit32.rshift(value, 1)
+					table.insert(values, bit32.band(value, 1) == 1 and -magnitude or magnitude)
+					value, shift = 0, 0
+				else
+					shift = shift + 5
+				end
+			end
+
+			-- Source lines are relative to the previous segment, the first segment of a line is the one we report
+			if #values >= 4 then
+				source_line = source_line + values[3]
+				if result[generated_line] == nil then
+					result[generated_line] = source_line + 1
+				end
+			end
+		end
+
+		generated_line = generated_line + 1
+	end
+
+	return result
+end
+
+-- Lines without a mapping belong to the statement above them
+ropy.sourcemap.lookup = function(lines, line)
+	for i = line, 1, -1 do
+		if lines[i] ~= nil then
+			return lines[i]
+		end
+	end
+
+	return nil
+end
+
+ropy.sourcemap.traceback = function(message, maps)
+	local decoded = {}
+
+	local function translate(script, line)
+		-- Accept both full names and plain script names as keys
+		local mappings = maps[script] or maps[string.match(script, "([^%.]+)$")]
+		if mappings == nil then return nil end
+
+		if decoded[mappings] == nil then
+			decoded[mappings] = ropy.sourcemap.decode(mappings)
+		end
+
+		return ropy.sourcemap.lookup(decoded[mappings], tonumber(line))
+	end
+
+	-- ServerScriptService.main:12: attempt to index nil
+	message = string.gsub(message, "([%w_%.]+):(%d+)", function(script, line)
+		local source_line = translate(script, line)
+		if source_line == nil then return nil end
+
+		return script .. ".py:" .. source_line
+	end)
+
+	-- Script 'ServerScriptService.main', Line 12
+	message = string.gsub(message, "Script '([^']+)', Line (%d+)", function(script, line)
+		local source_line = translate(script, line)
+		if source_line == nil then return nil end
+
+		return "Script '" .. script .. ".py', Line " .. source_line
+	end)
+
+	return message
+end
+
 return ropy;
\ No newline at end of file
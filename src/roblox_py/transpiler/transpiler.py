@@ -1,17 +1,100 @@
 from ..util import transpilation as transpilation_util;
-from ..util import strings as string_util;
+from ..util import sourcemap as sourcemap_util;
+from ..util import diagnostics as diagnostics_util;
+from ..util import manifest as manifest_util;
 
 import os
 import ast
+import fnmatch
+import hashlib
+import pathlib
 
-def get_ast_tree(file_path: str) -> dict[str, str]:
+# The runtime module, installed as ropy.lua next to the ModuleScripts
+runtime_file = pathlib.Path(__file__).resolve().parent.parent / "ropy_module.lua";
+runtime_name = "ropy.lua";
+
+# Read once per process: the daemon and the build install it over and over
+runtime_cache: dict[str, any] = {};
+
+def get_failure(diagnostics: diagnostics_util.Diagnostics) -> dict[str, any]:
+    # "error" is every problem in the file, readable as is; "diagnostics" is the same as plain dicts
+    return { "error": diagnostics.format(), "diagnostics": diagnostics.to_list() };
+
+def parse_source(source: str, diagnostics: diagnostics_util.Diagnostics | None = None) -> dict[str, any]:
+    diagnostics = diagnostics or diagnostics_util.Diagnostics();
+
+    # Try ast.parse(ast.unparse(result))
+    try:
+        return { "tree": ast.parse(source), "error": None };
+    except SyntaxError as e:
+        diagnostics.add_syntax_error(e);
+    except Exception as e:
+        diagnostics.add("could not parse file: " + str(e));
+
+    return get_failure(diagnostics);
+
+def get_directives(file_path: str | None, settings: dict) -> list[str]:
+    # "directives" in ropy.json maps globs (relative to inDirectory) to Luau directives, e.g. { "shared/*.py": ["strict", "native"] }
+    # Every matching glob adds its directives, in order
+    directives = [];
+
+    if file_path is None or "directives" not in settings: return directives;
+
+    relative_path = os.path.relpath(file_path, settings.get("inDirectory", ".")).replace(os.sep, "/");
+
+    for pattern in settings["directives"]:
+        if not fnmatch.fnmatch(relative_path, pattern): continue;
+
+        for directive in settings["directives"][pattern]:
+            if directive not in directives: directives.append(directive);
+
+    return directives;
+
+def transpile_source(source: str, settings: dict | None = None, file_path: str | None = None) -> dict[str, str]:
+    settings = settings or {};
+    diagnostics = diagnostics_util.Diagnostics(file_path);
+
+    attempt = parse_source(source, diagnostics);
+
+    if attempt["error"] != None: return attempt;
+
+    source_map = sourcemap_util.SourceMap() if settings.get("sourceMaps") else None;
+
+    result = transpilation_util.transpile_module(
+        attempt["tree"], source_map, settings.get("profile", "dev"), get_directives(file_path, settings), diagnostics,
+        settings.get("builtins")
+    );
+
+    if diagnostics.has_errors(): return get_failure(diagnostics);
+
+    return {
+        "result": result, "source_map": source_map, "error": None, "diagnostics": diagnostics.to_list(),
+        "source_hash": manifest_util.get_source_hash(source)
+    };
+
+def check_source(source: str, settings: dict | None = None, file_path: str | None = None) -> dict[str, any]:
+    # Every problem transpile_source would report. Problems are found while the statements are transpiled, so that
+    # still happens, but the output is thrown away as it's made and nothing is hoisted, minified or mapped
+    settings = settings or {};
+    diagnostics = diagnostics_util.Diagnostics(file_path);
+
+    attempt = parse_source(source, diagnostics);
+
+    if attempt["error"] != None: return { "error": attempt["error"], "diagnostics": attempt["diagnostics"] };
+
+    for chunk in transpilation_util.transpile_module_chunks(attempt["tree"], None, "dev", [], diagnostics, settings.get("builtins"), True):
+        pass;
+
+    return { "error": diagnostics.format() if diagnostics.has_errors() else None, "diagnostics": diagnostics.to_list() };
+
+def read_source(file_path: str) -> dict[str, str]:
     result: any = None;
     error: str | None = None;
 
     # Try to read the file given to us
     try:
-        file = open(file_path);
-        result = file.read();
+        with open(file_path) as file:
+            result = file.read();
     except Exception as e:
         error = file_path + " is not a valid path: " + str(e);
 
@@ -21,27 +104,153 @@ def get_ast_tree(file_path: str) -> dict[str, str]:
 
     if not isinstance(result, str): return { "error": "File is valid" };
 
-# Try ast.parse(ast.unparse(result))
-    try:
-        parsed: ast.AST = ast.parse(result);
-    except Exception as e:
-        error = "Error parsing file: " + str(e);
+    return { "source": result, "error": None };
 
-    result = transpilation_util.transpile_module(parsed);
+def get_ast_tree(file_path: str, settings: dict | None = None) -> dict[str, str]:
+    attempt = read_source(file_path);
 
-    return { "result": result, "error": error };
+    if attempt["error"] != None:
+        diagnostics = diagnostics_util.Diagnostics(file_path);
+        diagnostics.add(attempt["error"]);
+        return get_failure(diagnostics);
 
-def transpile_file(file_path: str) -> dict[str, str]:
-    attempt = get_ast_tree(file_path);
+    return transpile_source(attempt["source"], settings, file_path);
+
+def transpile_file(file_path: str, settings: dict | None = None) -> dict[str, str]:
+    attempt = get_ast_tree(file_path, settings);
 
     # Get errored file out of the way
     if attempt["error"] != None: return attempt;
     
-    return { "result": attempt["result"] };
+    return {
+        "result": attempt["result"], "source_map": attempt["source_map"], "diagnostics": attempt["diagnostics"],
+        "source_hash": attempt["source_hash"]
+    };
+
+def stream_file(file_path: str, new_file_name: str, settings: dict | None = None) -> dict[str, any]:
+    # Like transpile_file, but every top level statement is written to new_file_name as soon as it's transpiled,
+    # so only the largest statement is ever held in memory. "result" is the length of what was written, "output" its digest
+    settings = settings or {};
+    diagnostics = diagnostics_util.Diagnostics(file_path);
+
+    attempt = read_source(file_path);
+
+    if attempt["error"] != None:
+        diagnostics.add(attempt["error"]);
+        return get_failure(diagnostics);
+
+    source_hash = manifest_util.get_source_hash(attempt["source"]);
+    attempt = parse_source(attempt["source"], diagnostics);
+
+    if attempt["error"] != None: return attempt;
+
+    source_map = sourcemap_util.SourceMap() if settings.get("sourceMaps") else None;
+    digest = manifest_util.OutputDigest();
+    length = 0;
+
+    os.makedirs(os.path.dirname(new_file_name), exist_ok=True)
+    with open(new_file_name, "wb") as f:
+        chunks = transpilation_util.transpile_module_chunks(
+            attempt["tree"], source_map, settings.get("profile", "dev"), get_directives(file_path, settings), diagnostics,
+            settings.get("builtins")
+        );
+
+        for chunk in chunks:
+            f.write(digest.update(chunk));
+            length += len(chunk);
+
+    # Don't leave half a script behind for Rojo to sync
+    if diagnostics.has_errors():
+        os.remove(new_file_name);
+        return get_failure(diagnostics);
+
+    return {
+        "result": length, "source_map": source_map, "output": digest, "diagnostics": diagnostics.to_list(),
+        "source_hash": source_hash
+    };
+
+def write_file(new_file_name: str, result: str) -> manifest_util.OutputDigest:
+    # Written as UTF-8 with \n line endings on every platform, so the manifest's hashes don't depend on who built it
+    digest = manifest_util.OutputDigest();
+
+    os.makedirs(os.path.dirname(new_file_name), exist_ok=True)
+    with open(new_file_name, "wb") as f:
+        f.write(digest.update(result))
+
+    return digest;
+
+def get_destination_path(full_name: str, folder_origin: str, folder_destination: str) -> str:
+    # ropy/server/main.server.py -> <cwd>/src/server/main.server.lua, on any platform
+    name_without_root = pathlib.Path(os.path.abspath(full_name)).relative_to(os.path.abspath(folder_origin));
+
+    # Only the last .py becomes .lua
+    return str(pathlib.Path.cwd() / folder_destination / name_without_root.with_suffix(".lua"));
+
+def write_source_map(full_name: str, new_file_name: str, source_map: sourcemap_util.SourceMap):
+    # main.lua -> main.lua.map, which Rojo doesn't sync, so it never reaches the client
+    source = os.path.relpath(full_name, os.path.dirname(new_file_name)).replace(os.sep, "/");
+
+    with open(new_file_name + ".map", "w") as f:
+        f.write(source_map.to_json(os.path.basename(new_file_name), source));
+
+def is_module_script(file_name: str) -> bool:
+    # Check if file_path ends in either .client.lua or .server.lua
+    return (file_name.endswith(".lua") and
+        not file_name.endswith(".client.lua") and
+        not file_name.endswith(".server.lua"));
+
+def get_runtime() -> dict[str, any]:
+    # { "content": bytes, "sha1": str }
+    if "content" not in runtime_cache:
+        content = runtime_file.read_bytes();
+        runtime_cache["sha1"] = hashlib.sha1(content).hexdigest();
+        runtime_cache["content"] = content;
+
+    return runtime_cache;
+
+def install_runtime(module_folder: str) -> dict[str, any]:
+    # Writes ropy.lua to module_folder, unless it's already there: an untouched file is one less change for Rojo to sync.
+    # Returns { "output": path, "sha1": str, "size": int, "written": bool }
+    runtime = get_runtime();
+    target = pathlib.Path(module_folder) / runtime_name;
+
+    result = { "output": str(target), "sha1": runtime["sha1"], "size": len(runtime["content"]), "written": False };
+
+    if target.is_file() and hashlib.sha1(target.read_bytes()).hexdigest() == runtime["sha1"]: return result;
+
+    target.parent.mkdir(parents=True, exist_ok=True);
+    target.write_bytes(runtime["content"]);
+    result["written"] = True;
+
+    return result;
+
+def transpile_folder(folder_origin: str, folder_destination: str, settings: dict | None = None) -> dict[str, int]:
+    # results holds the length of every output, which is dropped as soon as it's written so memory doesn't grow with the project
+    settings = settings or {};
+    streaming = settings.get("streaming", False);
 
-def transpile_folder(folder_origin: str, folder_destination: str) -> dict[str, str]:
     results = {};
     errors = {};
+    # Every file's diagnostics, so the whole build is reported at once
+    diagnostics = diagnostics_util.Diagnostics();
+    # Every output's hash, size and runtime helpers, written to ropy-manifest.json
+    manifest = manifest_util.Manifest();
+    manifest.build = manifest_util.get_build_key(settings);
+
+    # Empty the destination FOLDER, except for the runtime, which is only rewritten if it changed (see install_runtime)
+    runtimes = [];
+
+    for root, dirs, files in os.walk(folder_destination, topdown=False):
+        for name in files:
+            if name == runtime_name:
+                runtimes.append(os.path.join(root, name));
+                continue;
+
+            os.remove(os.path.join(root, name));
+        for name in dirs:
+            if len(os.listdir(os.path.join(root, name))) == 0: os.rmdir(os.path.join(root, name));
+
+    module_folder = "";
 
     for root, dirs, files in os.walk(folder_origin, topdown=False):
         # Loop through directories and files
@@ -52,60 +261,83 @@ def transpile_folder(folder_origin: str, folder_destination: str) -> dict[str, s
             # Get full name
             full_name = os.path.join(root, name);
 
-            # Transpile and add the result to result[name]
-            transpilation = transpile_file(full_name)
+            new_file_name = get_destination_path(full_name, folder_origin, folder_destination);
+
+            # Transpile and write the result to the destination folder
+            if streaming:
+                transpilation = stream_file(full_name, new_file_name, settings);
+            else:
+                transpilation = transpile_file(full_name, settings);
+
+                if "result" in transpilation:
+                    transpilation["output"] = write_file(new_file_name, transpilation["result"]);
+
+            diagnostics.extend(transpilation.get("diagnostics", []));
 
             if "error" in transpilation:
                 errors[full_name] = transpilation["error"];
+                continue;
 
-            if "result" in transpilation:
-                results[full_name] = transpilation["result"];
+            results[full_name] = transpilation["result"] if streaming else len(transpilation["result"]);
+            manifest.add(full_name, new_file_name, transpilation["output"], transpilation["source_hash"]);
 
-    # Empty the destination FOLDER
-    for root, dirs, files in os.walk(folder_destination, topdown=False):
-        for name in files:
-            os.remove(os.path.join(root, name));
-        for name in dirs:
-            os.rmdir(os.path.join(root, name));
+            if transpilation.get("source_map") is not None:
+                write_source_map(full_name, new_file_name, transpilation["source_map"]);
 
-    # Get folder_destination full name
-    folder_destination_full_name = os.path.join(os.getcwd(), folder_destination);
+            if is_module_script(new_file_name):
+                module_folder = os.path.dirname(new_file_name);
 
-    module_folder = "";
-    
-    # Create and write the results to the destination folder
-    for full_name in results:
-        name_without_root = full_name.replace(folder_origin + "\\", "");
+    # Without any ModuleScripts, the runtime goes to the root of the destination
+    runtime = install_runtime(module_folder or folder_destination);
+    manifest.set_runtime(runtime["output"], runtime["sha1"], runtime["size"]);
 
-        new_file_name = os.path.join(folder_destination_full_name, name_without_root)
+    # Runtimes from earlier builds that are somewhere else now
+    for path in runtimes:
+        if os.path.abspath(path) == os.path.abspath(runtime["output"]): continue;
 
-        # Replace the last .py with .lua
-        new_file_name = string_util.replace_reverse(new_file_name, ".py", ".lua", 1);
+        os.remove(path);
 
-        os.makedirs(os.path.dirname(new_file_name), exist_ok=True)
-        with open(new_file_name, "w") as f:
-            f.write(results[full_name])
-    
-        # Check if file_path ends in either .client.py or .server.py
-    
-        if (new_file_name.endswith(".lua") and 
-        not new_file_name.endswith(".client.lua") and
-        not new_file_name.endswith(".server.lua")):
-            module_folder = os.path.dirname(new_file_name);
-    
-    # Get folder of this script
-    script = os.path.dirname(os.path.realpath(__file__));
-    
-    # Get folder of script
-    script_folder = os.path.dirname(script);
+        if len(os.listdir(os.path.dirname(path))) == 0 and os.path.abspath(os.path.dirname(path)) != os.path.abspath(folder_destination):
+            os.rmdir(os.path.dirname(path));
+
+    manifest.write();
+
+    return {"results": results, "errors": errors, "diagnostics": diagnostics.to_list()};
+
+def check_folder(folder_origin: str, settings: dict | None = None) -> dict[str, any]:
+    # Every problem in the project without writing anything. Sources the last build transpiled without errors,
+    # with the same settings and transpiler (see ropy-manifest.json), aren't checked again
+    settings = settings or {};
+
+    manifest = manifest_util.Manifest.read();
+    reuse = manifest.build == manifest_util.get_build_key(settings);
+
+    checked = 0;
+    cached = 0;
+    errors = {};
+    diagnostics = diagnostics_util.Diagnostics();
+
+    for root, dirs, files in os.walk(folder_origin):
+        for name in files:
+            if not name.endswith(".py"): continue;
+
+            full_name = os.path.join(root, name);
+            checked += 1;
+
+            attempt = read_source(full_name);
+
+            if attempt["error"] != None:
+                errors[full_name] = attempt["error"];
+                diagnostics.extend([{ "message": attempt["error"], "severity": "error", "file": full_name }]);
+                continue;
 
-    # Get ropy_module.lua in script_folder
-    ropy_module = os.path.join(script_folder, "ropy_module.lua");
+            if reuse and manifest.get_source_hash(full_name) == manifest_util.get_source_hash(attempt["source"]):
+                cached += 1;
+                continue;
 
-    # Clone ropy_module.lua to module_folder
-    os.system("copy " + ropy_module + " " + module_folder);
+            check = check_source(attempt["source"], settings, full_name);
+            diagnostics.extend(check["diagnostics"]);
 
-    # Rename ropy_module.lua to ropy.lua
-    os.rename(os.path.join(module_folder, "ropy_module.lua"), os.path.join(module_folder, "ropy.lua"));
+            if check["error"] != None: errors[full_name] = check["error"];
 
-    return {"results": results, "errors": errors};
\ No newline at end of file
+    return { "checked": checked, "cached": cached, "errors": errors, "diagnostics": diagnostics.to_list() };
@@ -0,0 +1,142 @@
+import ast
+
+# Python type hints -> Luau type annotations
+# Anything we don't recognise is passed through by name, so Roblox types (Player, Vector3, ...) and classes keep working
+
+python_types = {
+    "int": "number",
+    "float": "number",
+    "str": "string",
+    "bytes": "string",
+    "bool": "boolean",
+    "None": "nil",
+    "NoneType": "nil",
+    "object": "any",
+    "Any": "any",
+    "list": "{any}",
+    "List": "{any}",
+    "set": "{any}",
+    "Set": "{any}",
+    "frozenset": "{any}",
+    "tuple": "{any}",
+    "Tuple": "{any}",
+    "dict": "{[any]: any}",
+    "Dict": "{[any]: any}",
+    "Callable": "(...any) -> ...any",
+};
+
+# Generic containers, by the Luau shape they take
+list_types = ["list", "List", "set", "Set", "frozenset", "FrozenSet", "Sequence", "Iterable", "Iterator", "Collection"];
+dict_types = ["dict", "Dict", "Mapping", "MutableMapping"];
+tuple_types = ["tuple", "Tuple"];
+
+def get_annotation_name(node: ast.expr) -> str | None:
+    # int, typing.List, ...
+    if isinstance(node, ast.Name): return node.id;
+    if isinstance(node, ast.Attribute): return node.attr;
+
+    return None;
+
+def get_union(types: list[str]) -> str:
+    # Luau spells "T | None" as "T?"
+    optional = "nil" in types;
+    types = [luau_type for luau_type in types if luau_type != "nil"];
+
+    # Drop duplicates (int | float is just number)
+    types = list(dict.fromkeys(types));
+
+    if len(types) == 0: return "nil";
+
+    union = " | ".join(types);
+
+    if not optional: return union;
+
+    if len(types) > 1 or "->" in union: union = "(" + union + ")";
+
+    return union + "?";
+
+def get_union_members(node: ast.expr) -> list[ast.expr]:
+    # int | str | None
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        return get_union_members(node.left) + get_union_members(node.right);
+
+    return [node];
+
+def get_luau_type(node: ast.expr | None) -> str:
+    if node is None: return "any";
+
+    if isinstance(node, ast.Constant):
+        if node.value is None: return "nil";
+
+        # "Foo" (forward references)
+        if isinstance(node.value, str):
+            try:
+                return get_luau_type(ast.parse(node.value, mode="eval").body);
+            except SyntaxError:
+                return "any";
+
+        return "any";
+
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        return get_union([get_luau_type(member) for member in get_union_members(node)]);
+
+    name = get_annotation_name(node);
+
+    if name is not None: return python_types.get(name, name);
+
+    if not isinstance(node, ast.Subscript): return "any";
+
+    name = get_annotation_name(node.value);
+    arguments = node.slice.elts if isinstance(node.slice, ast.Tuple) else [node.slice];
+
+    if name in list_types:
+        return "{" + get_luau_type(arguments[0]) + "}";
+
+    if name in dict_types and len(arguments) == 2:
+        return "{[" + get_luau_type(arguments[0]) + "]: " + get_luau_type(arguments[1]) + "}";
+
+    if name in tuple_types:
+        # tuple[int, ...]
+        if len(arguments) == 2 and isinstance(arguments[1], ast.Constant) and arguments[1].value is Ellipsis:
+            return "{" + get_luau_type(arguments[0]) + "}";
+
+        return "{" + get_union([get_luau_type(argument) for argument in arguments]) + "}";
+
+    if name == "Optional":
+        return get_union([get_luau_type(arguments[0]), "nil"]);
+
+    if name == "Union":
+        return get_union([get_luau_type(argument) for argument in arguments]);
+
+    if name == "Callable" and len(arguments) == 2 and isinstance(arguments[0], ast.List):
+        parameters = [get_luau_type(argument) for argument in arguments[0].elts];
+        return "(" + ", ".join(parameters) + ") -> " + get_return_type(arguments[1]);
+
+    return "any";
+
+def is_tuple_annotation(node: ast.expr) -> bool:
+    # tuple[int, str], but not tuple[int, ...] (which can have any length)
+    if not isinstance(node, ast.Subscript) or get_annotation_name(node.value) not in tuple_types: return False;
+
+    arguments = node.slice.elts if isinstance(node.slice, ast.Tuple) else [node.slice];
+
+    return not any(isinstance(argument, ast.Constant) and argument.value is Ellipsis for argument in arguments);
+
+def get_return_type(node: ast.expr) -> str:
+    # Functions returning a tuple return several values
+    if is_tuple_annotation(node):
+        arguments = node.slice.elts if isinstance(node.slice, ast.Tuple) else [node.slice];
+        return "(" + ", ".join(get_luau_type(argument) for argument in arguments) + ")";
+
+    # Functions that return None return nothing
+    luau_type = get_luau_type(node);
+
+    return "()" if luau_type == "nil" else luau_type;
+
+def get_optional(luau_type: str) -> str:
+    # For variables that start out as nil
+    if luau_type.endswith("?") or luau_type == "nil" or luau_type == "any": return luau_type;
+
+    if " " in luau_type and not luau_type.startswith("{"): luau_type = "(" + luau_type + ")";
+
+    return luau_type + "?";
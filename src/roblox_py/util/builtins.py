@@ -0,0 +1,113 @@
+import ast
+import json
+
+# Every builtin function and method the transpiler maps onto something else, looked up once per call site.
+# Projects can add their own in ropy.json:
+# "builtins": {
+#     "wait": "task.wait",                                          wait(1) -> task.wait(1)
+#     "http.get": "game:GetService(\"HttpService\"):GetAsync",     http.get(url) -> game:GetService("HttpService"):GetAsync(url)
+#     "list.clear": "table.clear"                                   items.clear() -> table.clear(items)
+# }
+# "<kind>.<method>" with a value kind passes the receiver as the first argument, any other prefix is the name of a module
+# (or object) whose methods are mapped, and the receiver is dropped.
+
+# Receivers that are values, the runtime symbol gets them as the first argument
+value_kinds = ["list", "dict", "set", "tuple", "str"];
+
+class BuiltinIndex:
+    __slots__ = ("functions", "special", "methods", "default_methods");
+
+    def __init__(self):
+        # name -> runtime symbol, e.g. "len" -> "ropy.len"
+        self.functions: dict[str, str] = {};
+        # Functions that transpile_call has dedicated code for, as long as nobody remapped them
+        self.special: set[str] = set();
+        # method -> { receiver kind or module name -> runtime symbol }
+        self.methods: dict[str, dict[str, str]] = {};
+        # method -> runtime symbol, for methods that only one value kind has, used when we can't tell the receiver's kind
+        self.default_methods: dict[str, str] = {};
+
+    def add_function(self, name: str, symbol: str):
+        self.functions[name] = symbol;
+        self.special.discard(name);
+
+    def add_method(self, kind: str, method: str, symbol: str):
+        self.methods.setdefault(method, {})[kind] = symbol;
+
+    def finish(self):
+        # Precompute everything lookups would otherwise scan for
+        self.default_methods = {};
+
+        for method in self.methods:
+            symbols = [self.methods[method][kind] for kind in self.methods[method] if kind in value_kinds];
+
+            if len(symbols) == 1: self.default_methods[method] = symbols[0];
+
+    def get_method(self, method: str, receiver: ast.expr, local_receiver: bool = False) -> tuple[str, bool] | None:
+        # Returns (runtime symbol, whether the receiver is passed as the first argument), None for a plain method call.
+        # local_receiver: the receiver is a name of the module, which can't be the module a mapping is for
+        candidates = self.methods.get(method);
+
+        if candidates is None: return None;
+
+        # http.get(url), with "http.get" mapped in ropy.json
+        if isinstance(receiver, ast.Name) and receiver.id in candidates and receiver.id not in value_kinds and not local_receiver:
+            return (candidates[receiver.id], False);
+
+        kind = get_receiver_kind(receiver);
+
+        if kind is not None:
+            return (candidates[kind], True) if kind in candidates else None;
+
+        if method in self.default_methods: return (self.default_methods[method], True);
+
+        return None;
+
+def get_receiver_kind(receiver: ast.expr) -> str | None:
+    # The kind of value a receiver is, when it's obvious from the code
+    if isinstance(receiver, (ast.List, ast.ListComp)): return "list";
+    if isinstance(receiver, (ast.Dict, ast.DictComp)): return "dict";
+    if isinstance(receiver, (ast.Set, ast.SetComp)): return "set";
+    if isinstance(receiver, ast.Tuple): return "tuple";
+    if isinstance(receiver, ast.JoinedStr): return "str";
+    if isinstance(receiver, ast.Constant) and isinstance(receiver.value, str): return "str";
+
+    return None;
+
+# One index per distinct "builtins" setting, so a build computes it once rather than per file
+index_cache: dict[str, BuiltinIndex] = {};
+
+def get_index(functions: dict, attribute_functions: dict, special: list[str], custom: dict[str, str] | None = None) -> BuiltinIndex:
+    key = json.dumps(custom or {}, sort_keys=True);
+
+    if key in index_cache: return index_cache[key];
+
+    index = BuiltinIndex();
+
+    for name in functions:
+        if isinstance(functions[name], str):
+            index.add_function(name, functions[name]);
+            continue;
+
+        # Groups like "discriminate_tables"
+        for grouped_name in functions[name]:
+            index.add_function(grouped_name, functions[name][grouped_name]);
+
+    index.special = set(special);
+
+    # "List" -> "list"
+    for kind in attribute_functions:
+        for method in attribute_functions[kind]:
+            index.add_method(kind.lower(), method, attribute_functions[kind][method]);
+
+    for name in custom or {}:
+        if "." in name:
+            kind, method = name.split(".", 1);
+            index.add_method(kind, method, custom[name]);
+        else:
+            index.add_function(name, custom[name]);
+
+    index.finish();
+    index_cache[key] = index;
+
+    return index;
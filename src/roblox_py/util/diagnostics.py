@@ -0,0 +1,92 @@
+import ast
+import json
+
+# Problems found while transpiling, collected per file instead of stopping the build at the first one.
+# Everything here turns into plain dicts (to_dict/from_dict), so diagnostics can cross threads, processes and the daemon socket
+
+class Diagnostic:
+    __slots__ = ("message", "severity", "node", "file", "line", "column");
+
+    def __init__(self, message: str, severity: str = "error", node: str | None = None,
+        file: str | None = None, line: int | None = None, column: int | None = None):
+        self.message: str = message;
+        self.severity: str = severity; # "error" | "warning"
+        # The ast class name, e.g. "ClassDef"
+        self.node: str | None = node;
+        self.file: str | None = file;
+        # 1 based like Python's tracebacks, column 0 based like ast
+        self.line: int | None = line;
+        self.column: int | None = column;
+
+    def to_dict(self) -> dict:
+        return {
+            "message": self.message,
+            "severity": self.severity,
+            "node": self.node,
+            "file": self.file,
+            "line": self.line,
+            "column": self.column,
+        };
+
+    @staticmethod
+    def from_dict(values: dict):
+        return Diagnostic(values["message"], values.get("severity", "error"), values.get("node"),
+            values.get("file"), values.get("line"), values.get("column"));
+
+    def format(self) -> str:
+        # file:line:column: error: message, like compilers and editors expect
+        location = self.file or "<source>";
+
+        if self.line is not None:
+            location = location + ":" + str(self.line);
+
+            if self.column is not None: location = location + ":" + str(self.column + 1);
+
+        return location + ": " + self.severity + ": " + self.message;
+
+class Diagnostics:
+    def __init__(self, file: str | None = None):
+        # The file new diagnostics belong to, unless they say otherwise
+        self.file: str | None = file;
+        self.items: list[Diagnostic] = [];
+
+    def add(self, message: str, node: ast.AST | None = None, severity: str = "error") -> Diagnostic:
+        diagnostic = Diagnostic(
+            message, severity,
+            node.__class__.__name__ if node is not None else None,
+            self.file,
+            getattr(node, "lineno", None),
+            getattr(node, "col_offset", None),
+        );
+
+        self.items.append(diagnostic);
+
+        return diagnostic;
+
+    def add_syntax_error(self, error: SyntaxError) -> Diagnostic:
+        # SyntaxError columns are 1 based
+        diagnostic = self.add("invalid syntax: " + str(error.msg));
+        diagnostic.line = error.lineno;
+        diagnostic.column = error.offset - 1 if error.offset else None;
+
+        return diagnostic;
+
+    def extend(self, diagnostics: list[dict]):
+        # Merge what another file, thread or process found
+        for values in diagnostics:
+            self.items.append(Diagnostic.from_dict(values));
+
+    def has_errors(self) -> bool:
+        return any(diagnostic.severity == "error" for diagnostic in self.items);
+
+    def to_list(self) -> list[dict]:
+        return [diagnostic.to_dict() for diagnostic in self.items];
+
+    def format(self) -> str:
+        return "\n".join(diagnostic.format() for diagnostic in self.items);
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "errors": len([diagnostic for diagnostic in self.items if diagnostic.severity == "error"]),
+            "diagnostics": self.to_list(),
+        }, indent=2);
@@ -0,0 +1,209 @@
+import ast
+
+# Values that loops (and comprehensions) would otherwise build again on every iteration, made once into module level locals:
+#   while True:
+#       if state in ("idle", "walk"): ...           -> local _ropy_c1 = {"idle", "walk"} at the top of the module
+#       part.Velocity = Vector3.new(0, 10, 0)       -> local _ropy_c2 = Vector3.new(0, 10, 0)
+# Only values built from constants qualify, so they can live at the top of the module without depending on anything.
+# Expressions that read variables stay where they are: hoisting them would evaluate them (and raise their errors)
+# even when the loop never runs them, unlike Python
+
+# The most values we hoist, Luau allows 200 locals per function (see max_hoisted_strings in minify.py)
+max_hoisted_constants = 64;
+
+# Roblox datatypes are immutable, so building one from constants always gives the same value
+pure_functions = {
+    "Vector3": ["new"],
+    "Vector2": ["new"],
+    "Color3": ["new", "fromRGB", "fromHSV", "fromHex"],
+    "BrickColor": ["new"],
+    "UDim": ["new"],
+    "UDim2": ["new", "fromScale", "fromOffset"],
+    "CFrame": ["new", "Angles", "fromEulerAnglesXYZ", "fromOrientation"],
+    "NumberRange": ["new"],
+    "Rect": ["new"],
+    "TweenInfo": ["new"],
+    "math": ["sqrt", "rad", "deg", "sin", "cos", "tan", "abs", "floor", "ceil", "log", "exp"],
+};
+
+pure_constants = {
+    "math": ["pi", "huge"],
+};
+
+# Builtins that only read the table they're given
+reading_functions = ["len", "sum", "min", "max"];
+
+def get_bound_names(module: ast.Module) -> set[str]:
+    # Every name the module binds anywhere, which would shadow the Roblox globals in pure_functions
+    names = set();
+
+    for node in ast.walk(module):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id);
+        elif isinstance(node, ast.arg):
+            names.add(node.arg);
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name);
+        elif isinstance(node, ast.alias):
+            names.add(node.asname or node.name.split(".")[0]);
+
+    return names;
+
+class LoopConstants:
+    def __init__(self, module: ast.Module):
+        self.bound_names: set[str] = get_bound_names(module);
+        # id(child) -> parent, for every node of the module
+        self.parents: dict[int, ast.AST] = {};
+        # The hoisted nodes, outermost only
+        self.found: list[ast.expr] = [];
+
+        for node in ast.walk(module):
+            for child in ast.iter_child_nodes(node):
+                self.parents[id(child)] = node;
+
+    def is_global_attribute(self, node: ast.expr, members: dict[str, list[str]]) -> bool:
+        # Vector3.new, math.pi, ... as long as the module doesn't have its own Vector3 or math
+        return (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id in members and
+            node.attr in members[node.value.id] and node.value.id not in self.bound_names);
+
+    def is_pure_call(self, node: ast.expr) -> bool:
+        return (isinstance(node, ast.Call) and len(node.keywords) == 0 and self.is_global_attribute(node.func, pure_functions) and
+            all(self.is_constant(arg) for arg in node.args));
+
+    def is_constant(self, node: ast.expr | None) -> bool:
+        # Whether node is made of constants only, and so gives the same value wherever it's evaluated
+        if isinstance(node, ast.Constant): return True;
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)): return isinstance(node.operand, ast.Constant);
+
+        if isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+            return all(self.is_constant(elt) for elt in node.elts);
+
+        # {**other} has a None key
+        if isinstance(node, ast.Dict):
+            return all(key is not None and self.is_constant(key) for key in node.keys) and all(self.is_constant(value) for value in node.values);
+
+        return self.is_global_attribute(node, pure_constants) or self.is_pure_call(node);
+
+    def is_read_only_use(self, node: ast.expr) -> bool:
+        # Whether the table node evaluates to can't be changed (or kept) by whatever uses it
+        parent = self.parents.get(id(node));
+
+        # state in ("idle", "walk")
+        if isinstance(parent, ast.Compare) and node in parent.comparators:
+            return isinstance(parent.ops[parent.comparators.index(node)], (ast.In, ast.NotIn));
+
+        # {"a": 1}[key]
+        if isinstance(parent, ast.Subscript) and parent.value is node: return isinstance(parent.ctx, ast.Load);
+
+        # for direction in (-1, 1)
+        if isinstance(parent, (ast.For, ast.comprehension)) and parent.iter is node: return True;
+
+        # len((1, 2, 3))
+        if isinstance(parent, ast.Call) and node in parent.args:
+            return isinstance(parent.func, ast.Name) and parent.func.id in reading_functions and parent.func.id not in self.bound_names;
+
+        return False;
+
+    def is_read_only_name(self, assign: ast.Assign, scope: ast.AST) -> bool:
+        # weights = {"a": 1} in a loop, with weights only ever read afterwards (weights[k], k in weights, ...)
+        if len(assign.targets) != 1 or not isinstance(assign.targets[0], ast.Name): return False;
+
+        name = assign.targets[0].id;
+
+        for node in ast.walk(scope):
+            if isinstance(node, (ast.Global, ast.Nonlocal)) and name in node.names: return False;
+
+            if not isinstance(node, ast.Name) or node.id != name or node is assign.targets[0]: continue;
+
+            if not isinstance(node.ctx, ast.Load) or not self.is_read_only_use(node): return False;
+
+        return True;
+
+    def is_hoistable(self, node: ast.expr, scope: ast.AST) -> bool:
+        if not isinstance(node, (ast.Tuple, ast.List, ast.Set, ast.Dict, ast.Call)) or not self.is_constant(node): return False;
+
+        # Immutable
+        if isinstance(node, ast.Call): return True;
+
+        # Reading an element of ((1, 2), (3, 4)) gives another shared table, but tuples can't be changed.
+        # [[1, 2], [3, 4]] could be changed through its elements, which we don't follow
+        for child in ast.walk(node):
+            if child is not node and isinstance(child, (ast.List, ast.Set, ast.Dict)): return False;
+
+        parent = self.parents.get(id(node));
+
+        if isinstance(parent, ast.Assign) and parent.value is node: return self.is_read_only_name(parent, scope);
+
+        return self.is_read_only_use(node);
+
+    def visit(self, node: ast.AST, in_loop: bool, scope: ast.AST):
+        if in_loop and isinstance(node, ast.expr) and self.is_hoistable(node, scope):
+            self.found.append(node);
+            return;
+
+        # What's inside a function (or lambda) runs once per call, not once per iteration. Defaults still run here
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            body = node.body if isinstance(node.body, list) else [node.body];
+
+            for child in ast.iter_child_nodes(node):
+                if any(child is statement for statement in body):
+                    self.visit(child, False, node);
+                else:
+                    self.visit(child, in_loop, scope);
+
+            return;
+
+        # The condition and the body run on every iteration, the iterable and "else" once
+        if isinstance(node, ast.While):
+            self.visit(node.test, True, scope);
+            for statement in node.body: self.visit(statement, True, scope);
+            for statement in node.orelse: self.visit(statement, in_loop, scope);
+            return;
+
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            self.visit(node.target, in_loop, scope);
+            self.visit(node.iter, in_loop, scope);
+            for statement in node.body: self.visit(statement, True, scope);
+            for statement in node.orelse: self.visit(statement, in_loop, scope);
+            return;
+
+        # Everything but the first iterable runs once per element
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+            for i in range(len(node.generators)):
+                generator = node.generators[i];
+                self.visit(generator.iter, in_loop or i > 0, scope);
+
+                for condition in generator.ifs: self.visit(condition, True, scope);
+
+            for child in [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]:
+                self.visit(child, True, scope);
+
+            return;
+
+        for child in ast.iter_child_nodes(node):
+            self.visit(child, in_loop, scope);
+
+def get_loop_constants(module: ast.Module, short_names=None) -> tuple[dict[int, str], dict[str, ast.expr]]:
+    # Returns (id(node) -> local name, local name -> the node it's made from), equal values sharing one local.
+    # short_names (minify.ShortNames) names them in the "release" profile
+    finder = LoopConstants(module);
+    finder.visit(module, False, module);
+
+    names: dict[int, str] = {};
+    values: dict[str, ast.expr] = {};
+    # ast.dump -> local name
+    shared: dict[str, str] = {};
+
+    for node in finder.found:
+        key = ast.dump(node);
+
+        if key not in shared:
+            if len(shared) >= max_hoisted_constants: continue;
+
+            shared[key] = short_names.get_next() if short_names is not None else "_ropy_c" + str(len(shared) + 1);
+            values[shared[key]] = node;
+
+        names[id(node)] = shared[key];
+
+    return (names, values);
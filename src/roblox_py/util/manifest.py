@@ -0,0 +1,128 @@
+import os
+import re
+import json
+import hashlib
+
+# What a build produced, so Rojo plugins and deploy scripts can diff builds without reading every script again.
+# Written next to ropy.json (outDirectory is synced by Rojo, which would turn it into a ModuleScript):
+# {
+#   "version": 1,
+#   "files": {
+#     "ropy/shared/main.py": { "output": "src/shared/main.lua", "sha1": "...", "size": 1234, "helpers": ["ropy.len"], "source_sha1": "..." }
+#   },
+#   "runtime": { "output": "src/shared/ropy.lua", "sha1": "...", "size": 12345 },
+#   "build": "..."
+# }
+# "build" and "source_sha1" let "ropy --check" skip the sources the last build already transpiled without errors
+manifest_file = "ropy-manifest.json";
+
+# ropy.<helper> outside of strings and comments
+helper_pattern = re.compile(
+    "\"(?:\\\\.|[^\"\\\\\\n])*\"" +
+    "|'(?:\\\\.|[^'\\\\\\n])*'" +
+    "|--[^\\n]*" +
+    "|\\bropy((?:\\.[A-Za-z_][A-Za-z0-9_]*)+)"
+);
+
+def get_source_hash(source: str) -> str:
+    return hashlib.sha1(source.encode()).hexdigest();
+
+def get_build_key(settings: dict) -> str:
+    # What every output depends on besides its own source: the settings and the transpiler itself
+    hasher = hashlib.sha1();
+    hasher.update(json.dumps(settings, sort_keys=True).encode());
+
+    compiler_folder = os.path.dirname(os.path.dirname(os.path.realpath(__file__)));
+
+    for root, dirs, files in os.walk(compiler_folder):
+        # os.walk order is filesystem dependent
+        dirs.sort();
+
+        for name in sorted(files):
+            if not name.endswith(".py") and not name.endswith(".lua"): continue;
+
+            full_name = os.path.join(root, name);
+            stat = os.stat(full_name);
+
+            hasher.update((os.path.relpath(full_name, compiler_folder) + "\0" + str(stat.st_mtime_ns) + "\0" + str(stat.st_size) + "\n").encode());
+
+    return hasher.hexdigest();
+
+def get_relative_path(path: str) -> str:
+    # Relative to the project folder, with / on every platform so manifests from different machines compare equal
+    return os.path.relpath(path).replace(os.sep, "/");
+
+class OutputDigest:
+    # Hash, size and runtime helpers of one output, fed as it's written
+    def __init__(self):
+        self.hasher = hashlib.sha1();
+        self.size: int = 0;
+        self.helpers: set[str] = set();
+
+    def update(self, text: str) -> bytes:
+        # Returns the bytes that go to disk
+        data = text.encode();
+
+        self.hasher.update(data);
+        self.size += len(data);
+
+        for match in helper_pattern.finditer(text):
+            if match.group(1) is not None: self.helpers.add("ropy" + match.group(1));
+
+        return data;
+
+    def to_dict(self, output: str) -> dict:
+        return {
+            "output": get_relative_path(output),
+            "sha1": self.hasher.hexdigest(),
+            "size": self.size,
+            "helpers": sorted(self.helpers),
+        };
+
+class Manifest:
+    def __init__(self, files: dict[str, dict] | None = None, runtime: dict | None = None, build: str | None = None):
+        self.files: dict[str, dict] = files or {};
+        self.runtime: dict | None = runtime;
+        # get_build_key of the settings the outputs were made with
+        self.build: str | None = build;
+
+    def add(self, source: str, output: str, digest: OutputDigest, source_hash: str | None = None):
+        self.files[get_relative_path(source)] = digest.to_dict(output);
+
+        if source_hash is not None: self.files[get_relative_path(source)]["source_sha1"] = source_hash;
+
+    def get_source_hash(self, source: str) -> str | None:
+        # The source an output was made from, None if it isn't in the manifest
+        return self.files.get(get_relative_path(source), {}).get("source_sha1");
+
+    def set_runtime(self, output: str, sha1: str, size: int):
+        self.runtime = { "output": get_relative_path(output), "sha1": sha1, "size": size };
+
+    def remove(self, source: str):
+        self.files.pop(get_relative_path(source), None);
+
+    def to_dict(self) -> dict:
+        manifest = { "version": 1, "files": dict(sorted(self.files.items())) };
+
+        if self.runtime is not None: manifest["runtime"] = self.runtime;
+        if self.build is not None: manifest["build"] = self.build;
+
+        return manifest;
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2);
+
+    def write(self, path: str = manifest_file):
+        # json.dump writes as it goes, the whole document as one string would be the largest thing a build holds
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2);
+
+    @staticmethod
+    def read(path: str = manifest_file):
+        # An empty manifest if there is none (yet) or it can't be read
+        try:
+            with open(path) as f:
+                manifest = json.load(f);
+                return Manifest(manifest["files"], manifest.get("runtime"), manifest.get("build"));
+        except (OSError, ValueError, KeyError):
+            return Manifest();
@@ -0,0 +1,178 @@
+import ast
+import re
+
+# Helpers for the "release" profile, which makes scripts as small as possible since they replicate to every player
+
+luau_keywords = [
+    "and", "break", "do", "else", "elseif", "end", "false", "for", "function", "if", "in",
+    "local", "nil", "not", "or", "repeat", "return", "then", "true", "until", "while", "continue", "type", "export"
+];
+
+# Identifiers the transpiler writes out itself, short names must never collide with these
+emitted_names = ["ropy", "game", "result", "k", "_", "yield", "_ropy_help", "_ropy_i", "_ropy_v", "pairs", "ipairs", "math", "self", "bit32", "_ropy_t", "_ropy_k"];
+
+name_characters = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_";
+name_continue_characters = name_characters + "0123456789";
+
+# The most strings we hoist into module level locals, Luau allows 200 locals per function
+max_hoisted_strings = 64;
+
+def get_module_names(module: ast.Module) -> set[str]:
+    # Every identifier the Python source could reference, so short names can't shadow any of them
+    names = set(luau_keywords + emitted_names);
+
+    for node in ast.walk(module):
+        if isinstance(node, ast.Name):
+            names.add(node.id);
+        elif isinstance(node, ast.arg):
+            names.add(node.arg);
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name);
+
+    return names;
+
+class ShortNames:
+    def __init__(self, reserved: set[str]):
+        self.reserved = reserved;
+        self.count = 0;
+
+    def get_next(self) -> str:
+        while True:
+            # 0 -> a, 52 -> _, 53 -> aa, ...
+            index = self.count;
+            self.count += 1;
+
+            name = name_characters[index % len(name_characters)];
+            index = index // len(name_characters);
+
+            while index > 0:
+                index -= 1;
+                name = name + name_continue_characters[index % len(name_continue_characters)];
+                index = index // len(name_continue_characters);
+
+            if name not in self.reserved: return name;
+
+def get_docstrings(module: ast.Module) -> set[int]:
+    # transpile_function recognises help strings by their quotes, so they have to stay literal
+    docstrings = set();
+
+    for node in ast.walk(module):
+        if not isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)): continue;
+        if len(node.body) == 0: continue;
+
+        first = node.body[0];
+
+        if isinstance(first, ast.Expr) and isinstance(first.value, ast.Str):
+            docstrings.add(id(first.value));
+
+    return docstrings;
+
+def get_hoisted_strings(module: ast.Module, short_names: ShortNames) -> dict[str, str]:
+    # String constants that are cheaper as one module level local than repeated inline: value -> local name
+    docstrings = get_docstrings(module);
+    counts: dict[str, int] = {};
+
+    for node in ast.walk(module):
+        if not isinstance(node, ast.Str) or id(node) in docstrings: continue;
+
+        counts[node.s] = counts.get(node.s, 0) + 1;
+
+    candidates = [];
+
+    for value in counts:
+        count = counts[value];
+        if count < 2: continue;
+
+        # Assume a 2 character name, "local aa=" + literal + "\n" is paid once, every use then costs 2 characters
+        literal_length = len(value) + 2;
+        saved = count * literal_length - (count * 2 + len("local aa=\n") + literal_length);
+
+        if saved > 0: candidates.append((saved, value));
+
+    candidates.sort(key=lambda candidate: -candidate[0]);
+
+    hoisted = {};
+
+    for saved, value in candidates[:max_hoisted_strings]:
+        hoisted[value] = short_names.get_next();
+
+    return hoisted;
+
+token_pattern = re.compile(
+    "\0\\d+:\\d+\0" +                   # source map line mark
+    "|\"(?:\\\\.|[^\"\\\\\\n])*\"" +    # "string"
+    "|'(?:\\\\.|[^'\\\\\\n])*'" +       # 'string'
+    "|--\\[\\[.*?\\]\\]" +              # --[[ comment ]]
+    "|--[^\\n]*" +                      # -- comment
+    "|\\n" +
+    "|[ \\t\\r]+" +
+    "|[A-Za-z0-9_.]+" +
+    "|."
+);
+
+def is_word_character(character: str) -> bool:
+    return character.isalnum() or character == "_" or character == ".";
+
+def needs_space(previous: str, next: str) -> bool:
+    # Whether joining the two tokens would change how Luau reads them
+    if previous == "" or next == "": return False;
+
+    last = previous[-1];
+    first = next[0];
+
+    if is_word_character(last) and is_word_character(first): return True;
+
+    # "- -x" is not a comment
+    if last == "-" and first == "-": return True;
+
+    # "t[ [[x]] ]" is not a long string
+    if last == "[" and (first == "[" or first == "="): return True;
+
+    return False;
+
+def squeeze_whitespace(text: str) -> str:
+    # Drop comments, indentation, blank lines and every space Luau doesn't need.
+    # Line marks stay in front of the code they belong to, or go away with their line if it turns out blank
+    result = [];
+    line_marks = [];
+    line_has_code = False;
+    previous = "";
+    pending_space = False;
+
+    for match in token_pattern.finditer(text):
+        token = match.group(0);
+
+        if token[0] == "\0":
+            if line_has_code:
+                result.append(token);
+            else:
+                line_marks.append(token);
+            continue;
+
+        if token.startswith("--"): continue;
+
+        if token == "\n":
+            if line_has_code: result.append("\n");
+            line_marks = [];
+            line_has_code = False;
+            previous = "";
+            pending_space = False;
+            continue;
+
+        if token.isspace():
+            pending_space = True;
+            continue;
+
+        if not line_has_code:
+            result.extend(line_marks);
+            line_marks = [];
+
+        if pending_space and needs_space(previous, token):
+            result.append(" ");
+
+        result.append(token);
+        line_has_code = True;
+        previous = token;
+        pending_space = False;
+
+    return "".join(result);
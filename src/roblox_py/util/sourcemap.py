@@ -0,0 +1,95 @@
+import json
+import re
+
+# Source map v3 (https://sourcemaps.info/spec.html), one segment per generated line that starts a Python statement.
+# Lines without a segment belong to the last mapped line above them, which is what ropy.sourcemap in ropy_module.lua assumes
+
+# transpile_line marks the start of every line it emits with "\0<line>:<column>\0", the marks are removed in finish_module
+line_mark_pattern = re.compile("\0(\\d+):(\\d+)\0");
+
+base64_characters = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+
+def get_line_mark(node: any) -> str:
+    if not hasattr(node, "lineno"): return "";
+
+    return "\0" + str(node.lineno) + ":" + str(node.col_offset) + "\0";
+
+def encode_vlq(value: int) -> str:
+    # Sign goes in the lowest bit, then 5 bits per base64 character with the 6th bit as continuation
+    value = (-value << 1) | 1 if value < 0 else value << 1;
+    result = "";
+
+    while True:
+        digit = value & 31;
+        value = value >> 5;
+
+        if value > 0: digit = digit | 32;
+
+        result = result + base64_characters[digit];
+
+        if value == 0: return result;
+
+class SourceMap:
+    def __init__(self):
+        # Generated line (0 based) -> (source line (0 based), source column)
+        self.lines: dict[int, tuple[int, int]] = {};
+
+    def add_line(self, generated_line: int, source_line: int, source_column: int):
+        self.lines[generated_line] = (source_line, source_column);
+
+    def shift_lines(self, offset: int):
+        self.lines = { generated_line + offset: self.lines[generated_line] for generated_line in self.lines };
+
+    def get_mappings(self) -> str:
+        groups = [];
+        previous_line = 0;
+        previous_column = 0;
+
+        if len(self.lines) == 0: return "";
+
+        for generated_line in range(0, max(self.lines) + 1):
+            if generated_line not in self.lines:
+                groups.append("");
+                continue;
+
+            source_line, source_column = self.lines[generated_line];
+
+            # [generated column, source index, source line, source column], all but the first relative to the previous segment
+            groups.append(
+                encode_vlq(0) + encode_vlq(0) +
+                encode_vlq(source_line - previous_line) + encode_vlq(source_column - previous_column)
+            );
+
+            previous_line = source_line;
+            previous_column = source_column;
+
+        return ";".join(groups);
+
+    def to_json(self, file: str, source: str) -> str:
+        return json.dumps({
+            "version": 3,
+            "file": file,
+            "sources": [source],
+            "names": [],
+            "mappings": self.get_mappings(),
+        }, separators=(",", ":"));
+
+def finish_module(text: str, source_map: SourceMap | None = None, first_line: int = 0) -> str:
+    # Strip the line marks, recording where they were if we're asked to.
+    # first_line is where text starts in the module, for modules that are finished a chunk at a time
+    if source_map is None: return line_mark_pattern.sub("", text);
+
+    lines = text.split("\n");
+
+    for i in range(0, len(lines)):
+        line = lines[i];
+
+        if "\0" not in line: continue;
+
+        # A line can hold several marks (e.g. a lambda body), the first one is the statement it starts with
+        match = line_mark_pattern.search(line);
+        source_map.add_line(first_line + i, int(match.group(1)) - 1, int(match.group(2)));
+
+        lines[i] = line_mark_pattern.sub("", line);
+
+    return "\n".join(lines);
@@ -2,6 +2,14 @@ import ast
 import re
 from typing_extensions import Self
 
+from . import sourcemap as sourcemap_util
+from . import minify as minify_util
+from . import truthiness as truthiness_util
+from . import hoisting as hoisting_util
+from . import annotations as annotations_util
+from . import diagnostics as diagnostics_util
+from . import builtins as builtins_util
+
 # Refer to:
 # https://docs.python.org/3/library/ast.html#abstract-grammar
 
@@ -29,13 +37,48 @@ builtin_functions = {
     "len": "ropy.len",		            # OK
     "help": "",                         # OK
     "range": "ropy.range",	            # OK
+    "sum": "ropy.sum",                  # OK
+    "min": "ropy.min",                  # OK (see transpile_min_max)
+    "max": "ropy.max",                  # OK (see transpile_min_max)
+    "sorted": "ropy.sorted",            # OK (see transpile_sorted)
+    "zip": "ropy.zip",                  # OK
+    "enumerate": "ropy.enumerate",      # OK
+    "map": "ropy.map",                  # OK
+    "filter": "ropy.filter",            # OK
     "discriminate_tables": {
         "set": "ropy.set",		        # OK
         "all": "ropy.all",		        # OK
     }
 }
 
+# Python operators with a Luau compound assignment (x += 1), Luau evaluates the target of those only once
+compound_operators = [ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow];
+
+# Luau has no bitwise operators, numbers go through bit32 (and are 32 bit unsigned there)
+bitwise_functions = {
+    ast.BitAnd: "bit32.band",
+    ast.BitOr: "bit32.bor",
+    ast.BitXor: "bit32.bxor",
+    ast.LShift: "bit32.lshift",
+    ast.RShift: "bit32.arshift",
+};
+
+# Builtins with their own code in transpile_call
+special_functions = ["help", "min", "max", "sorted"] + list(builtin_functions["discriminate_tables"]);
+
+# Python modules that the runtime provides
+runtime_modules = {
+    "asyncio": "ropy.asyncio",
+}
+
 class CodeBlock:
+    # One of these is made for every scope of every module, slots keep them small and without a __dict__
+    __slots__ = (
+        "block_id", "type", "variables", "children", "parent", "line", "deep_variables", "node", "renames",
+        "assigned_names", "boolean_names", "variable_types", "release", "short_names", "strings", "diagnostics",
+        "statement", "builtins", "tuple_functions", "constants", "constant_values",
+    );
+
     def __init__(self, block_id: str, type: str, variables: list[str], children: list[Self], parent: Self | None = None):
         self.block_id: str = block_id;
         self.type: str = type;
@@ -45,6 +88,37 @@ class CodeBlock:
         self.line: str = "";
         self.deep_variables: list[str] = [];
         self.node: ast.FunctionDef = "";
+        # Python name -> short name, only filled in the "release" profile
+        self.renames: dict[str, str] = {};
+        # Filled in on demand for function and top blocks, see is_boolean_name
+        self.assigned_names: set[str] | None = None;
+        self.boolean_names: set[str] | None = None;
+        # Variable -> Luau type, from annotated assignments (x: int = 0) in function and top blocks
+        self.variable_types: dict[str, str] = {};
+
+        # Only used on the top block
+        self.release: bool = False;
+        self.short_names: minify_util.ShortNames | None = None;
+        self.strings: dict[str, str] = {};
+        self.diagnostics: diagnostics_util.Diagnostics | None = None;
+        # The innermost line being transpiled, for diagnostics about nodes without a position (operators)
+        self.statement: ast.AST | None = None;
+        # Every builtin function and method the module can call (see util/builtins.py)
+        self.builtins: builtins_util.BuiltinIndex | None = None;
+        # Module level functions that return several values instead of a tuple (see get_tuple_functions)
+        self.tuple_functions: set[str] = set();
+        # Tables and values loops would otherwise build on every iteration, made once at the top of the module
+        # (see util/hoisting.py): id(node) -> local name, and local name -> node
+        self.constants: dict[int, str] = {};
+        self.constant_values: dict[str, ast.expr] = {};
+
+    def get_root(self) -> Self:
+        root = self;
+
+        while root.parent is not None:
+            root = root.parent;
+
+        return root;
 
     def get_function(self) -> Self:
         if self.parent is None: return self;
@@ -58,11 +132,13 @@ class CodeBlock:
 
         return ancestor;
 
-    def add_variable(self, variable: str) -> None | str: # "surface" | "deep"
+    def add_variable(self, variable: str, rename: bool = True) -> None | str: # "surface" | "deep"
         function_block = self.get_function();
         
         if variable in function_block.variables or variable in function_block.deep_variables: return None;
 
+        if rename: function_block.add_short_name(variable);
+
         if function_block == self:
             function_block.variables.append(variable);
             return "surface"
@@ -70,6 +146,86 @@ class CodeBlock:
             function_block.deep_variables.append(variable);
             return "deep"
 
+    def add_parameter(self, parameter: str) -> None:
+        self.variables.append(parameter);
+        self.add_short_name(parameter);
+
+    def add_short_name(self, variable: str) -> None:
+        root = self.get_root();
+
+        if not root.release: return;
+
+        # Short names are unique within the module, so they can't shadow each other across scopes
+        self.renames[variable] = root.short_names.get_next();
+
+    def find_scope(self, name: str) -> Self | None:
+        # The function (or top) block a name is assigned in, like Python's scoping.
+        # Lambda parameters and comprehension targets come first, they hide the names of the function around them
+        ancestor = self;
+
+        while ancestor.parent is not None and ancestor.type != "function":
+            if ancestor.type in ("lambda", "comprehension") and name in ancestor.variables: return ancestor;
+            ancestor = ancestor.parent;
+
+        function_block = self.get_function();
+
+        while True:
+            if function_block.boolean_names is None and function_block.node != "":
+                function_block.assigned_names, function_block.boolean_names = truthiness_util.get_scope_booleans(function_block.node);
+
+            if function_block.assigned_names is not None and name in function_block.assigned_names:
+                return function_block;
+
+            if function_block.parent is None: return None;
+
+            function_block = function_block.parent.get_function();
+
+    def is_boolean_name(self, name: str) -> bool:
+        # Whether the name only ever holds a bool in the scope it lives in
+        scope = self.find_scope(name);
+
+        # Lambdas and comprehensions have no boolean_names, their names could be anything
+        return scope is not None and scope.boolean_names is not None and name in scope.boolean_names;
+
+    def get_variable_type(self, variable: str) -> str | None:
+        # The Luau type a variable was annotated with, looking through every enclosing function
+        function_block = self.get_function();
+
+        while True:
+            if variable in function_block.variable_types: return function_block.variable_types[variable];
+
+            if function_block.parent is None: return None;
+
+            function_block = function_block.parent.get_function();
+
+    def get_name(self, variable: str) -> str:
+        # The name a variable is emitted as, looking through every enclosing scope
+        ancestor = self;
+
+        while ancestor is not None:
+            if variable in ancestor.renames: return ancestor.renames[variable];
+            ancestor = ancestor.parent;
+
+        return variable;
+
+    def dispose(self) -> None:
+        # Called on the top block once its module is emitted. Blocks point at their parent and their children,
+        # so without this the whole tree (and every ast node it holds on to) waits for the cycle collector
+        stack = [self];
+
+        while len(stack) > 0:
+            block = stack.pop();
+            stack.extend(block.children);
+
+            block.children = [];
+            block.parent = None;
+            block.node = "";
+            block.assigned_names = None;
+            block.boolean_names = None;
+            block.short_names = None;
+            block.statement = None;
+            block.builtins = None;
+
     def add_child(self, type: str, node: ast.FunctionDef | None = None) -> Self: # Preferred over __init__
         # New id is the self.block_id + "." + the next available int
         new_id = self.block_id + "." + str(len(self.children));
@@ -93,6 +249,8 @@ class CodeBlock:
         # kirby = ["(>'-')>","<('-'<)","^('-')^","v('-')v","(>'-')>","(^-^)"]; 
         # return "--[[" + " ".join(kirby[i % len(kirby)] for i in range(level)) + "]]"
         
+        if self.get_root().release: return "";
+
         spaces = 1;
         char = "\t";
 
@@ -100,7 +258,14 @@ class CodeBlock:
 
         return offset
 
-top_block = CodeBlock("0", "top", [], []);
+def report(message: str, node: ast.AST, block: CodeBlock) -> None:
+    # Record the problem and keep going, so one run finds every problem in the module
+    root = block.get_root();
+    diagnostic = root.diagnostics.add(message, node);
+
+    if diagnostic.line is None and root.statement is not None:
+        diagnostic.line = root.statement.lineno;
+        diagnostic.column = root.statement.col_offset;
 
 def get_function_block_by_name(name: str, within_block: CodeBlock) -> CodeBlock:
     # Loop through children of within_block, find the function with the same name
@@ -113,6 +278,8 @@ def get_function_block_by_name(name: str, within_block: CodeBlock) -> CodeBlock:
 def initialise_string(node: any, block: CodeBlock) -> str:
     result = "";
 
+    if block is not None and block.get_root().release: return result;
+
     if toggle_ast:
         result = result + "--[[" + node.__class__.__name__ + "]]"
 
@@ -121,144 +288,145 @@ def initialise_string(node: any, block: CodeBlock) -> str:
     
     return result;
 
-def process_builtin_attribute_function(node: ast.Call, block: CodeBlock) -> str | None:
-    # If I knew how to obtain the attributee node from the given node, I could do this
-    # builtin_list = builtin_attribute_functions;
-    # nodeType = "";
-    # b = node.func.value;
-    # print(isinstance(b, ast.Dict), isinstance(b, ast.Set), isinstance(b, ast.List), isinstance(b, ast.Tuple))
-    # if isinstance(node.func, ast.Dict):
-    #     builtin_list = builtin_attribute_functions["Dict"];
-    #     nodeType = "Dict";
-    # elif isinstance(node.func, ast.Set):
-    #     builtin_list = builtin_attribute_functions["Set"];
-    #     nodeType = "Set";
-    # elif isinstance(node.func, ast.List):
-    #     builtin_list = builtin_attribute_functions["List"];
-    #     nodeType = "List";
-    # elif isinstance(node.func, ast.Tuple):
-    #     builtin_list = builtin_attribute_functions["Tuple"];
-    #     nodeType = "Tuple";
-    # else:
-    #     return None;
-
-    # print(node.func.attr)
-
-    # if not node.func.attr in builtin_list:
-    #     return None;
-
-    # result = builtin_list[node.func.attr];
-
-    nodeType = ""
-    
-    # Loop through builtin_attribute_functions to find the correct function
-    for key in builtin_attribute_functions:
-        if node.func.attr in builtin_attribute_functions[key]:
-            nodeType = key;
-            break;
-    
-    if nodeType == "": return None;
+def get_keyword(node: ast.Call, name: str) -> ast.expr | None:
+    for keyword in node.keywords:
+        if keyword.arg == name: return keyword.value;
 
-    
-    result = builtin_attribute_functions[nodeType][node.func.attr];
+    return None;
 
-    result = result + "(" + transpile_expression(node.func.value, block);
+def join_arguments(arguments: list[str]) -> str:
+    # Optional arguments we don't pass are nil, so they can be left off the end
+    while len(arguments) > 0 and arguments[-1] == "nil":
+        arguments.pop();
 
-    if len(node.args) > 0:
-        result = result + ", "
-        # Loop through the args
-        for i in range(0, len(node.args)):
-                arg: ast.expr = node.args[i];
-                result = result + transpile_expression(arg, block);
+    return ", ".join(arguments);
 
-                if i != len(node.args) - 1:
-                    result = result + ", ";
+def transpile_min_max(node: ast.Call, block: CodeBlock) -> str:
+    new_name = builtin_functions[node.func.id];
+    key = get_keyword(node, "key");
+    default = get_keyword(node, "default");
 
-    result = result + ")";
+    arguments = [transpile_expression(arg, block) for arg in node.args];
 
-    return result;
+    # min(a, b) doesn't need a table
+    if len(arguments) > 1 and key is None:
+        return new_name + "_of(" + ", ".join(arguments) + ")";
+
+    iterable = arguments[0] if len(arguments) == 1 else "{" + ", ".join(arguments) + "}";
+
+    return new_name + "(" + join_arguments([
+        iterable,
+        transpile_expression(key, block) if key is not None else "nil",
+        transpile_expression(default, block) if default is not None else "nil",
+    ]) + ")";
+
+def transpile_sorted(node: ast.Call, block: CodeBlock) -> str:
+    key = get_keyword(node, "key");
+    reverse = get_keyword(node, "reverse");
+
+    return builtin_functions["sorted"] + "(" + join_arguments([
+        transpile_expression(node.args[0], block),
+        transpile_expression(key, block) if key is not None else "nil",
+        transpile_condition(reverse, block) if reverse is not None else "nil",
+    ]) + ")";
+
+def transpile_arguments(node: ast.Call, block: CodeBlock) -> list[str]:
+    return [transpile_expression(arg, block) for arg in node.args];
+
+def get_builtin_function(func_name: str, block: CodeBlock) -> str | None:
+    # The runtime symbol for a call to func_name. Names the module assigns (functions, parameters, variables)
+    # are its own, so scopes are resolved before the index is consulted
+    if block.find_scope(func_name) is not None: return None;
+
+    return block.get_root().builtins.functions.get(func_name);
+
+def get_builtin_method(node: ast.Call, block: CodeBlock) -> tuple[str, bool] | None:
+    # Same for methods: http.get(url) is only the one ropy.json maps if the module has no http of its own
+    receiver = node.func.value;
+    local_receiver = isinstance(receiver, ast.Name) and block.find_scope(receiver.id) is not None;
+
+    return block.get_root().builtins.get_method(node.func.attr, receiver, local_receiver);
+
+def transpile_method_call(node: ast.Call, block: CodeBlock) -> str | None:
+    # items.append(x) -> ropy.append.list(items, x), plus whatever ropy.json maps (see util/builtins.py)
+    method = get_builtin_method(node, block);
+
+    if method is None: return None;
+
+    symbol, pass_receiver = method;
+    arguments = transpile_arguments(node, block);
+
+    if pass_receiver: arguments.insert(0, transpile_expression(node.func.value, block));
+
+    return symbol + "(" + ", ".join(arguments) + ")";
+
+def transpile_help(node: ast.Call, block: CodeBlock) -> str:
+    # Reformulate help(function) to function(nil, nil, ... (one per parameter), "help"), see transpile_function
+    function_block = get_function_block_by_name(node.args[0].id, block) if isinstance(node.args[0], ast.Name) else None;
+
+    if function_block is None:
+        report("help() only works on functions defined in the same scope", node, block);
+        return "nil";
+
+    arguments = ["nil"] * len(function_block.node.args.args) + ["\"help\""];
+
+    return function_block.node.name + "(" + ", ".join(arguments) + ")";
+
+def transpile_discriminated(node: ast.Call, symbol: str, block: CodeBlock) -> str:
+    # set(...) and all(...) are implemented per kind of table
+    if len(node.args) == 0: return symbol + ".list()";
+
+    kind = "tuple";
+
+    if isinstance(node.args[0], ast.Dict): kind = "dict";
+    elif isinstance(node.args[0], ast.Set): kind = "set";
+    elif isinstance(node.args[0], ast.List): kind = "list";
+
+    return symbol + "." + kind + "(" + transpile_expression(node.args[0], block) + ")";
+
+def is_builtin_call(node: ast.Call, block: CodeBlock) -> bool:
+    # Whether the call goes to the runtime (or whatever ropy.json maps it to)
+    if isinstance(node.func, ast.Attribute): return get_builtin_method(node, block) is not None;
+
+    return isinstance(node.func, ast.Name) and get_builtin_function(node.func.id, block) is not None;
+
+def is_tuple_call(node: ast.expr, block: CodeBlock) -> bool:
+    # A call to a function of this module that returns several values
+    if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name): return False;
+
+    root = block.get_root();
+
+    return node.func.id in root.tuple_functions and block.find_scope(node.func.id) is root;
 
 def transpile_call(node: ast.Call, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
     if isinstance(node.func, ast.Attribute):
-        p = process_builtin_attribute_function(node, block);
-        if p is not None:
-            result = result + p;
-            return result;
+        method_call = transpile_method_call(node, block);
 
-    builtin: bool = (node.func.id in builtin_functions) or (node.func.id in builtin_functions["discriminate_tables"])
+        if method_call is not None: return result + method_call;
 
-    # if not built-in:
-    if not (isinstance(node.func, ast.Name) and not isinstance(node.func, ast.Attribute) and (builtin)):
-        transpiled_func = transpile_expression(node.func, block)
-        result = result + transpiled_func + "(";
+    index = block.get_root().builtins;
+    func_name = node.func.id if isinstance(node.func, ast.Name) else None;
+    symbol = get_builtin_function(func_name, block) if func_name is not None else None;
 
-        # Loop through the arguments
-        for i in range(0, len(node.args)):
-            arg = node.args[i];
-            result = result + transpile_expression(arg, block);
+    # Not a builtin (or a call on anything but a name)
+    if symbol is None:
+        return result + transpile_expression(node.func, block) + "(" + ", ".join(transpile_arguments(node, block)) + ")";
 
-            if i != len(node.args) - 1:
-                result = result + ", ";
-        
-        result = result + ")";
+    if func_name in index.special:
+        if func_name == "help": return result + transpile_help(node, block);
+        if func_name == "min" or func_name == "max": return result + transpile_min_max(node, block);
+        if func_name == "sorted": return result + transpile_sorted(node, block);
 
-        return result;
-        
-    func_name = node.func.id;
-
-    if func_name == "help":
-        # Reformulate help(function) to function([_,_,_,... (depending on #args) ],"help")
-        func = node.args[0];
-        # Get actual function from func (so we can get args length)
-        func = get_function_block_by_name(func.id, block).node
-        # Get amount of possible parameters
-        num_args = len(func.args.args);
-
-        result = result + func_name + "(" + ", ".join(["nil"]) * num_args + ",\"help\"";
-
-        # Replace only first instance of "help" with func.name
-        result = result.replace("help", func.name, 1);
-
-        result = result + ")";
-    elif func_name in builtin_functions["discriminate_tables"]:
-        new_name = builtin_functions["discriminate_tables"][func_name];
-        if len(node.args) == 0:
-            result = result + new_name + ".list()";
-        elif isinstance(node.args[0], ast.Dict):
-            result = result + new_name + ".dict(" + transpile_expression(node.args[0], block) + ")";
-        elif isinstance(node.args[0], ast.Set):
-            result = result + new_name + ".set(" + transpile_expression(node.args[0], block) + ")";
-        elif isinstance(node.args[0], ast.List):
-            result = result + new_name + ".list(" + transpile_expression(node.args[0], block) + ")";
-        elif isinstance(node.args[0], ast.Tuple):
-            result = result + new_name + ".tuple(" + transpile_expression(node.args[0], block) + ")";
-        elif isinstance(node.args[0], ast.GeneratorExp):
-            result = result + new_name + ".tuple(" + transpile_expression(node.args[0], block) + ")";
-        else:
-            result = result + new_name + ".tuple(" + transpile_expression(node.args[0], block) + ")";
-    else:
-        result = result + builtin_functions[func_name];
-        result = result + "(";
-        # Loop through the arguments
-        for i in range(0, len(node.args)):
-        
-        
-            arg = node.args[i];
-            result = result + transpile_expression(arg, block);
+        return result + transpile_discriminated(node, symbol, block);
 
-            if i != len(node.args) - 1:
-                result = result + ", ";
-
-        result = result + ")";        
-            
-    return result;
+    return result + symbol + "(" + ", ".join(transpile_arguments(node, block)) + ")";
 
 def transpile_while(node: ast.While, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
-    result = result + "while " + transpile_expression(node.test, block) + " do\n";
+    result = result + "while " + transpile_condition(node.test, block) + " do\n";
 
     result = result + transpile_lines(node.body, block.add_child("while"));
 
@@ -269,7 +437,7 @@ def transpile_while(node: ast.While, block: CodeBlock) -> str:
 def transpile_if(node: ast.If, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
-    if_line = "if " + transpile_expression(node.test, block);
+    if_line = "if " + transpile_condition(node.test, block);
 
     result = result + if_line;
     
@@ -286,29 +454,52 @@ def transpile_if(node: ast.If, block: CodeBlock) -> str:
 
     return result;
 
-def transpile_function(node: ast.FunctionDef, block: CodeBlock) -> str:
+def transpile_function(node: ast.FunctionDef | ast.AsyncFunctionDef, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
     # Get the function name
     function_name = node.name;
 
-    result = "function " + function_name + "(";
+    # async def f() -> f = ropy.async(function() ... end), calling it gives a task (see ropy_module.lua)
+    is_async = isinstance(node, ast.AsyncFunctionDef);
+
+    if is_async:
+        result = function_name + " = ropy.async(function(";
+    else:
+        result = "function " + function_name + "(";
+
+    new_function_block = block.add_child("function", node);
+
+    # The defaults belong to the last arguments
+    first_default = len(node.args.args) - len(node.args.defaults);
 
     # Loop through the arguments
     for i in range(0, len(node.args.args)):
         arg = node.args.args[i];
-        result = result + arg.arg;
+        new_function_block.add_parameter(arg.arg);
+        result = result + new_function_block.get_name(arg.arg);
+
+        # def f(x: int) -> function f(x: number)
+        if arg.annotation is not None:
+            luau_type = annotations_util.get_luau_type(arg.annotation);
+
+            # def f(x: int = None) -> function f(x: number?)
+            default = node.args.defaults[i - first_default] if i >= first_default else None;
+            if isinstance(default, ast.Constant) and default.value is None: luau_type = annotations_util.get_optional(luau_type);
+
+            result = result + ": " + luau_type;
+
         if i != len(node.args.args) - 1:
             result = result + ", ";
 
     result = result + ")";
 
-    new_function_block = block.add_child("function", node);
-
     transpiled_body = transpile_lines(node.body, new_function_block);
 
     # Get first line of result
     first_line = transpiled_body.split("\n")[0];
+    # Remove the source map line marks
+    first_line = sourcemap_util.line_mark_pattern.sub('', first_line)
     # Remove every character that resides between --[[ and ]] (ie remove comments)
     first_line = re.sub('--\[\[[^>]+\]]', '', first_line)
     # Remove every character that comes after -- (ie remove comments)
@@ -327,9 +518,12 @@ def transpile_function(node: ast.FunctionDef, block: CodeBlock) -> str:
         if len(node.args.args) > 0:
             result = result[:-1] + ", _ropy_help)";
         else:
-            result = result + "_ropy_help)";
+            result = result[:-1] + "_ropy_help)";
         
         result = result + "\n" + new_help_string
+    elif node.returns is not None:
+        # Functions with a help string also return it, so only the others get a return type
+        result = result + ": " + annotations_util.get_return_type(node.returns);
 
     header_length = len(result)
     result = result + "\n";
@@ -348,75 +542,297 @@ def transpile_function(node: ast.FunctionDef, block: CodeBlock) -> str:
             has_yield = True;
             assigned_to = "{}";
         
-        result = header + new_function_block.get_offset() + "local " + variable + " = " + assigned_to + ";" + result[header_length:]
+        declaration = new_function_block.get_name(variable);
+
+        # Declared up here as nil, so the annotated type has to allow nil
+        if variable in new_function_block.variable_types:
+            declaration = declaration + ": " + annotations_util.get_optional(new_function_block.variable_types[variable]);
+
+        result = header + new_function_block.get_offset() + "local " + declaration + " = " + assigned_to + ";" + result[header_length:]
 
     # If has_yield, return yield
     if has_yield:
         result = result + new_function_block.get_offset() + "return yield\n";
 
     # Add end to the end of the function
-    result = result + block.get_offset(-1) + "end\n";
+    result = result + block.get_offset(-1) + ("end)\n" if is_async else "end\n");
 
     return result;
 
+def is_boolean(node: ast.expr, block: CodeBlock) -> bool:
+    return truthiness_util.is_boolean(node, block.is_boolean_name);
+
+def get_truthiness_check(node: ast.expr, block: CodeBlock) -> str:
+    # Python truthiness for a value Luau can't be trusted with. Names are checked inline and only tables reach the runtime,
+    # anything else is evaluated once inside ropy.truthy
+    value = transpile_expression(node, block);
+
+    if not isinstance(node, ast.Name): return "ropy.truthy(" + value + ")";
+
+    return "(" + value + " and " + value + " ~= 0 and " + value + " ~= \"\" and (type(" + value + ") ~= \"table\" or ropy.truthy(" + value + ")))";
+
+def transpile_condition(node: ast.expr, block: CodeBlock) -> str:
+    # Anything Python tests for truthiness: if, while, comprehension ifs, "x if c else y", "not"
+    constant = truthiness_util.get_constant_truthiness(node);
+
+    if constant is not None: return "true" if constant else "false";
+
+    if is_boolean(node, block): return transpile_expression(node, block);
+
+    if isinstance(node, ast.BoolOp):
+        operator = " and " if isinstance(node.op, ast.And) else " or ";
+        conditions = [];
+
+        for value in node.values:
+            condition = transpile_condition(value, block);
+
+            # Keep the grouping of nested "and"/"or"
+            if isinstance(value, ast.BoolOp): condition = "(" + condition + ")";
+
+            conditions.append(condition);
+
+        return operator.join(conditions);
+
+    return get_truthiness_check(node, block);
+
 def transpile_boolop(node: ast.BoolOp, block: CodeBlock):
     result = initialise_string(node, block);
 
-    # Loop through the values
-    for i in range(0, len(node.values)):
+    # "a or b" is a value in Python (a if a is truthy, else b). Luau's and/or only agree with that when the left hand side
+    # is a bool or nil, anything else is checked the Python way
+    is_and = isinstance(node.op, ast.And);
+    operator = " and " if is_and else " or ";
+
+    def transpile_operand(value: ast.expr) -> str:
+        operand = transpile_expression(value, block);
+
+        if isinstance(value, (ast.BoolOp, ast.IfExp)): operand = "(" + operand + ")";
+
+        return operand;
+
+    # Python's "a or b or c" is "a or (b or c)"
+    right = transpile_operand(node.values[-1]);
+
+    for i in range(len(node.values) - 2, -1, -1):
         value = node.values[i];
-        result = result + transpile_expression(value);
-        if i != len(node.values) - 1:
-            result = result + " " + transpile_expression(node.op);
+        left = transpile_operand(value);
+        constant = truthiness_util.get_constant_truthiness(value);
+
+        if constant is not None:
+            # "0 or x" is x, "1 or x" is 1 (and x is never evaluated)
+            right = right if constant == is_and else left;
+        elif is_boolean(value, block):
+            right = left + operator + right;
+        elif truthiness_util.is_plain_read(value):
+            # Reading x or self.health again is harmless
+            if is_and:
+                right = "(if " + get_truthiness_check(value, block) + " then " + right + " else " + left + ")";
+            else:
+                right = "(if " + get_truthiness_check(value, block) + " then " + left + " else " + right + ")";
+        else:
+            # Calls and the like are evaluated once, and the right hand side only when it's needed
+            check = "ropy.truthy(_ropy_v)";
+            if is_and: check = "not " + check;
+
+            right = "(function(_ropy_v) if " + check + " then return _ropy_v end return " + right + " end)(" + left + ")";
+
+    return result + right;
+
+def transpile_ifexp(node: ast.IfExp, block: CodeBlock) -> str:
+    result = initialise_string(node, block)
+
+    # Luau's if expression only evaluates the branch it takes, like Python
+    result = result + "(if " + transpile_condition(node.test, block) + " then " + transpile_expression(node.body, block)
+    result = result + " else " + transpile_expression(node.orelse, block) + ")";
 
     return result;
 
 def transpile_return(node: ast.Return, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
+    if node.value is None: return result + "return";
+
+    function_block = block.get_function();
+    # Only callers of the functions in tuple_functions know to take several values, the others return a table
+    returns_tuple = (function_block.type == "function" and function_block.parent is block.get_root() and
+        function_block.node.name in block.get_root().tuple_functions);
+
+    # return x, y -> return x, y: several values rather than a table
+    if returns_tuple and isinstance(node.value, ast.Tuple):
+        return result + "return " + transpile_values(node.value, block, len(node.value.elts));
+
+    # Passes every value on
+    if returns_tuple and is_tuple_call(node.value, block):
+        return result + "return " + transpile_call(node.value, block);
+
+    returns_none = isinstance(node.value, ast.Constant) and node.value.value is None;
+
+    # Functions annotated "-> None" return nothing, see get_return_type in annotations.py
+    if (returns_none and function_block.type == "function" and function_block.node.returns is not None and
+        annotations_util.get_return_type(function_block.node.returns) == "()"):
+        return result + "return";
+
+    # A tuple held in a variable (or None), in a function that otherwise returns several values
+    if returns_tuple and not returns_none:
+        return result + "return ropy.unpack(" + transpile_expression(node.value, block) + ")";
+
     result = result + "return " + transpile_expression(node.value, block);
 
     return result;
 
+def transpile_values(node: ast.expr, block: CodeBlock, count: int) -> str:
+    # The elements of a tuple as a list of Luau values, so unpacking never builds a table:
+    # (b, a) -> b, a and get_pos() -> get_pos(), which returns several values
+    if isinstance(node, (ast.Tuple, ast.List)) and not any(isinstance(elt, ast.Starred) for elt in node.elts):
+        return ", ".join(transpile_expression(elt, block) for elt in node.elts);
+
+    # Only functions of this module are known to return several values, anything else could return a table
+    if is_tuple_call(node, block):
+        return transpile_call(node, block);
+
+    # A tuple held in a variable
+    if isinstance(node, ast.Name):
+        value = transpile_expression(node, block);
+        return ", ".join(value + "[" + str(i + 1) + "]" for i in range(count));
+
+    return "table.unpack(" + transpile_expression(node, block) + ", 1, " + str(count) + ")";
+
+def transpile_unpacking(target: ast.Tuple | ast.List, value: ast.expr, block: CodeBlock) -> str:
+    # a, b = b, a -> a, b = b, a, which like Python evaluates every value before assigning any
+    for elt in target.elts:
+        if not isinstance(elt, (ast.Name, ast.Attribute, ast.Subscript)):
+            report("unsupported unpacking into " + elt.__class__.__name__, elt, block);
+            return "-- unsupported unpacking";
+
+    # The values come first, for the same reason as in transpile_assign
+    values = transpile_values(value, block, len(target.elts));
+
+    declared = [];
+
+    for elt in target.elts:
+        if isinstance(elt, ast.Name) and block.add_variable(elt.id) == "surface":
+            declared.append(transpile_expression(elt, block));
+
+    targets = [transpile_expression(elt, block) for elt in target.elts];
+
+    if len(declared) == len(targets): return "local " + ", ".join(targets) + " = " + values;
+
+    # Some targets are new and others aren't (x, self.y = ...)
+    declaration = "local " + ", ".join(declared) + "; " if len(declared) > 0 else "";
+
+    return declaration + ", ".join(targets) + " = " + values;
+
 def transpile_assign(node: ast.Assign, block: CodeBlock) -> str:
 
     result = initialise_string(node, block)
 
+    # a = b = 0
+    if len(node.targets) > 1:
+        if not all(isinstance(target, ast.Name) for target in node.targets):
+            report("chained assignment is only supported to names", node, block);
+            return "-- unsupported chained assignment";
+
+        # The value is evaluated once, into the first target
+        lines = [transpile_assign(ast.Assign(targets=[node.targets[0]], value=node.value), block)];
+
+        for target in node.targets[1:]:
+            lines.append(transpile_assign(ast.Assign(targets=[target], value=node.targets[0]), block));
+
+        return result + "; ".join(lines);
+
+    node_target = node.targets[0];
+
+    # x, y = get_pos()
+    if isinstance(node_target, (ast.Tuple, ast.List)):
+        return result + transpile_unpacking(node_target, node.value, block);
+
     # Check if assignment is new (i.e check if we have to append "local" in front of the variable)
 
-    # Get targets as array
-    targets = [];
+    # The value comes first, so "x = x + 1" still reads the outer x when x becomes a new (renamed) local
+    value = transpile_expression(node.value, block);
+
     added: str = None # None | "surface" | "deep"
 
-    for i in range(0, len(node.targets)):
-        node_target = node.targets[i]
-        target = transpile_expression(node_target, block)
-        targets.append(target);
-        
-        if not isinstance(node_target, ast.Name): continue;
-        added = block.add_variable(target)
+    if isinstance(node_target, ast.Name):
+        added = block.add_variable(node_target.id)
 
     if added == "surface":
         result = result + "local ";
 
     # Assigns a variable to a value
+    result = result + transpile_expression(node_target, block) + " = " + value;
 
-    # Loop through the targets
-    for i in range(0, len(targets)):
-        target = targets[i];
-        result = result + target
-        if i != len(node.targets) - 1:
-            result = result + ", ";
+    return result
 
-    result = result + " = ";
+def transpile_annassign(node: ast.AnnAssign, block: CodeBlock) -> str:
+    result = initialise_string(node, block)
 
-    result = result + transpile_expression(node.value, block);
+    luau_type = annotations_util.get_luau_type(node.annotation);
 
-    return result
+    # obj.x: int = 0 and t[0]: int = 0 can't carry a type in Luau
+    if not isinstance(node.target, ast.Name):
+        if node.value is None: return "-- " + ast.unparse(node);
+
+        return result + transpile_expression(node.target, block) + " = " + transpile_expression(node.value, block);
+
+    value = transpile_expression(node.value, block) if node.value is not None else None;
+
+    added = block.add_variable(node.target.id);
+    target = transpile_expression(node.target, block);
+
+    if added is not None or node.target.id not in block.get_function().variable_types:
+        block.get_function().variable_types[node.target.id] = luau_type;
+
+    if added == "surface":
+        result = result + "local " + target + ": " + luau_type;
+
+        # x: int declares x without giving it a value
+        if value is None: return result;
+
+        return result + " = " + value;
+
+    # Already declared (or hoisted to the top of the function with its type)
+    if value is None: return "-- " + ast.unparse(node);
+
+    return result + target + " = " + value;
+
+def transpile_import(node: ast.Import, block: CodeBlock) -> str:
+    # Only asyncio exists in Luau, as part of the runtime
+    result = initialise_string(node, block)
+
+    for alias in node.names:
+        if alias.name not in runtime_modules:
+            report("unsupported import " + alias.name, node, block);
+            continue;
+
+        name = alias.asname or alias.name;
+
+        if block.add_variable(name) == "surface":
+            result = result + "local ";
+
+        result = result + block.get_name(name) + " = " + runtime_modules[alias.name] + "; ";
+
+    return result.rstrip() or "-- import";
+
+def transpile_await(node: ast.Await, block: CodeBlock) -> str:
+    # Suspends the current task until the awaited one is done
+    return "ropy.await(" + transpile_expression(node.value, block) + ")";
+
+def get_comprehension_block(node: ast.ListComp | ast.GeneratorExp, block: CodeBlock) -> CodeBlock:
+    # Comprehension targets only live in the comprehension, and could hold anything
+    comprehension_block = block.add_child("comprehension");
+
+    for generator in node.generators:
+        for target in ast.walk(generator.target):
+            if isinstance(target, ast.Name): comprehension_block.variables.append(target.id);
+
+    return comprehension_block;
 
 def transpile_listcomp(node: ast.ListComp, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
+    comprehension_block = get_comprehension_block(node, block);
+
     result = result + "(function()\n";
 
     result = result + block.get_offset(1) + "local result = {};\n";
@@ -424,19 +840,20 @@ def transpile_listcomp(node: ast.ListComp, block: CodeBlock) -> str:
     # Loop through the generators
     for i in range(0, len(node.generators)):
         generator = node.generators[i];
-        target = transpile_expression(generator.target, block);
-        iter = transpile_expression(generator.iter, block);
+        target = transpile_expression(generator.target, comprehension_block);
+        # The first iterable is evaluated outside of the comprehension
+        iter = transpile_expression(generator.iter, block if i == 0 else comprehension_block);
         ifs = generator.ifs;
 
         result = result + block.get_offset(1) + "for k, " + target
         result = result + " in pairs(" + iter + ") do\n";
 
         if len(ifs) == 0:
-            result = result + block.get_offset(2) + "result[k] = " + transpile_expression(node.elt, block) + ";\n";
+            result = result + block.get_offset(2) + "result[k] = " + transpile_expression(node.elt, comprehension_block) + ";\n";
         else:
             for j in range(0, len(ifs)):
                 if_ = ifs[j];
-                result = result + block.get_offset(2) + "if " + transpile_expression(if_.test, block) + " then\n";
+                result = result + block.get_offset(2) + "if " + transpile_condition(if_, comprehension_block) + " then\n";
                 result = result + block.get_offset(3)  + "result[k] = " + target + ";\n";
                 result = result + block.get_offset(2) + "end\n";
             
@@ -451,6 +868,8 @@ def transpile_listcomp(node: ast.ListComp, block: CodeBlock) -> str:
 def transpile_generatorexp(node: ast.GeneratorExp, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
+    comprehension_block = get_comprehension_block(node, block);
+
     result = result + "(function()\n";
 
     result = result + block.get_offset(1) + "local result = {};\n";
@@ -458,19 +877,20 @@ def transpile_generatorexp(node: ast.GeneratorExp, block: CodeBlock) -> str:
     # Loop through the generators
     for i in range(0, len(node.generators)):
         generator = node.generators[i];
-        target = transpile_expression(generator.target, block);
-        iter = transpile_expression(generator.iter, block);
+        target = transpile_expression(generator.target, comprehension_block);
+        # The first iterable is evaluated outside of the comprehension
+        iter = transpile_expression(generator.iter, block if i == 0 else comprehension_block);
         ifs = generator.ifs;
 
         result = result + block.get_offset(1) + "for k, " + target
         result = result + " in pairs(" + iter + ") do\n";
 
         if len(ifs) == 0:
-            result = result + block.get_offset(2) + "result[k] = " + transpile_expression(node.elt, block) + ";\n";
+            result = result + block.get_offset(2) + "result[k] = " + transpile_expression(node.elt, comprehension_block) + ";\n";
         else:
             for j in range(0, len(ifs)):
                 if_ = ifs[j];
-                result = result + block.get_offset(2) + "if " + transpile_expression(if_.test, block) + " then\n";
+                result = result + block.get_offset(2) + "if " + transpile_condition(if_, comprehension_block) + " then\n";
                 result = result + block.get_offset(3)  + "result[k] = " + target + ";\n";
                 result = result + block.get_offset(2) + "end\n";
 
@@ -483,13 +903,136 @@ def transpile_generatorexp(node: ast.GeneratorExp, block: CodeBlock) -> str:
     return result;
 
 
+def is_name_tuple(node: ast.expr, length: int) -> bool:
+    return (isinstance(node, ast.Tuple) and len(node.elts) == length and
+        all(isinstance(elt, ast.Name) for elt in node.elts));
+
+def transpile_dict_loop(node: ast.For, block: CodeBlock) -> str | None:
+    # for k, v in d.items() -> for k, v in pairs(d), and the same for keys() and values(), without the list Python builds
+    iter = node.iter;
+    target = node.target;
+
+    if not isinstance(iter, ast.Call) or not isinstance(iter.func, ast.Attribute) or len(iter.args) + len(iter.keywords) > 0:
+        return None;
+
+    # Mapped to something else in ropy.json
+    if is_builtin_call(iter, block): return None;
+
+    method = iter.func.attr;
+
+    if method == "items" and is_name_tuple(target, 2):
+        names = transpile_expression(target.elts[0], block) + ", " + transpile_expression(target.elts[1], block);
+    elif method == "keys" and isinstance(target, ast.Name):
+        names = transpile_expression(target, block);
+    elif method == "values" and isinstance(target, ast.Name):
+        names = "_, " + transpile_expression(target, block);
+    else:
+        return None;
+
+    return "for " + names + " in pairs(" + transpile_expression(iter.func.value, block) + ") do\n";
+
+def transpile_builtin_loop(node: ast.For, block: CodeBlock, for_block: CodeBlock) -> tuple[str, str] | None:
+    # "for ... in range/enumerate/zip/map/filter(...)" as a plain Luau loop, without building a table to iterate over.
+    # Returns the loop header and the lines that start its body, or None if the loop isn't one of these
+    iter = node.iter;
+    target = node.target;
+
+    dict_loop = transpile_dict_loop(node, block);
+
+    if dict_loop is not None: return (dict_loop, "");
+
+    if not isinstance(iter, ast.Call) or not isinstance(iter.func, ast.Name) or len(iter.keywords) > 0: return None;
+
+    func_name = iter.func.id;
+    args = iter.args;
+    offset = for_block.get_offset();
+
+    # The module has its own function with this name
+    if block.find_scope(func_name) is not None: return None;
+
+    if func_name == "range" and isinstance(target, ast.Name) and 1 <= len(args) <= 3:
+        # Same numbers as ropy.range: 1 is the default start and stop is included. Only counting up is the same loop
+        if len(args) == 3 and not (isinstance(args[2], ast.Constant) and type(args[2].value) == int and args[2].value > 0):
+            return None;
+
+        bounds = [transpile_expression(arg, block) for arg in args];
+
+        if len(bounds) == 1: bounds.insert(0, "1");
+
+        return ("for " + transpile_expression(target, block) + " = " + ", ".join(bounds) + " do\n", "");
+
+    if func_name == "enumerate" and 1 <= len(args) <= 2 and is_name_tuple(target, 2):
+        index = transpile_expression(target.elts[0], block);
+        value = transpile_expression(target.elts[1], block);
+        iterable = transpile_expression(args[0], block);
+
+        if len(args) == 1:
+            return ("for " + index + ", " + value + " in ipairs(" + iterable + ") do\n", "");
+
+        start = transpile_expression(args[1], block);
+
+        return (
+            "for _ropy_i, " + value + " in ipairs(" + iterable + ") do\n",
+            offset + "local " + index + " = _ropy_i + (" + start + ") - 1\n"
+        );
+
+    # Only plain names, since they are read on every iteration
+    if func_name == "zip" and len(args) > 0 and all(isinstance(arg, ast.Name) for arg in args) and is_name_tuple(target, len(args)):
+        lists = [transpile_expression(arg, block) for arg in args];
+        names = [transpile_expression(elt, block) for elt in target.elts];
+
+        length = "#" + lists[0] if len(lists) == 1 else "math.min(" + ", ".join("#" + list for list in lists) + ")";
+
+        return (
+            "for _ropy_i = 1, " + length + " do\n",
+            offset + "local " + ", ".join(names) + " = " + ", ".join(list + "[_ropy_i]" for list in lists) + "\n"
+        );
+
+    # Only functions that are referenced by name, a lambda would be created again on every iteration
+    if func_name == "map" and len(args) == 2 and isinstance(args[0], (ast.Name, ast.Attribute)) and isinstance(target, ast.Name):
+        return (
+            "for _, _ropy_v in " + transpile_expression(args[1], block) + " do\n",
+            offset + "local " + transpile_expression(target, block) + " = " + transpile_expression(args[0], block) + "(_ropy_v)\n"
+        );
+
+    if func_name == "filter" and len(args) == 2 and isinstance(target, ast.Name) and (
+        isinstance(args[0], (ast.Name, ast.Attribute)) or (isinstance(args[0], ast.Constant) and args[0].value is None)):
+
+        if isinstance(args[0], ast.Constant):
+            test = target;
+        else:
+            test = ast.Call(func=args[0], args=[target], keywords=[]);
+
+        return (
+            "for _, " + transpile_expression(target, block) + " in " + transpile_expression(args[1], block) + " do\n",
+            offset + "if not (" + transpile_condition(test, for_block) + ") then continue end\n"
+        );
+
+    return None;
+
 def transpile_for(node: ast.For, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
-    result = result + "for _," + transpile_expression(node.target, block) + " in " + transpile_expression(node.iter, block) + " do\n";
-
     for_block = block.add_child("for")
 
+    loop = transpile_builtin_loop(node, block, for_block);
+
+    # for x, y in points: unpack each element at the top of the body
+    if loop is None and is_name_tuple(node.target, len(getattr(node.target, "elts", []))):
+        names = [transpile_expression(elt, block) for elt in node.target.elts];
+
+        loop = (
+            "for _, _ropy_v in " + transpile_expression(node.iter, block) + " do\n",
+            for_block.get_offset() + "local " + ", ".join(names) + " = " + ", ".join("_ropy_v[" + str(i + 1) + "]" for i in range(len(names))) + "\n"
+        );
+
+    if loop is None:
+        loop = ("for _," + transpile_expression(node.target, block) + " in " + transpile_expression(node.iter, block) + " do\n", "");
+
+    header, prelude = loop;
+
+    result = result + header + prelude;
+
     result = result + transpile_lines(node.body, for_block);
 
     result = result + for_block.get_offset(-1) + "end\n";
@@ -533,61 +1076,100 @@ def transpile_compare(node: ast.Compare, block: CodeBlock):
 def transpile_unaryop(node: ast.UnaryOp, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
-    # Check the operator
-    if isinstance(node.op, ast.UAdd):
-        result = result + "+";
-    elif isinstance(node.op, ast.USub):
+    # "not x" is decided by Python's truthiness and binds looser than comparisons ("not a == b" is "not (a == b)")
+    if isinstance(node.op, ast.Not):
+        condition = transpile_condition(node.operand, block);
+
+        if not isinstance(node.operand, (ast.Name, ast.Constant, ast.Call, ast.Attribute, ast.Subscript)):
+            condition = "(" + condition + ")";
+
+        return result + "not " + condition;
+
+    # ~x
+    if isinstance(node.op, ast.Invert):
+        return result + "bit32.bnot(" + transpile_expression(node.operand, block) + ")";
+
+    # Check the operator (Luau has no unary +)
+    if isinstance(node.op, ast.USub):
         result = result + "-";
-    elif isinstance(node.op, ast.Not):
-        result = result + "not ";
-    elif isinstance(node.op, ast.Invert):
-        result = result + "not ";
 
-    result = result + transpile_expression(node.operand);
+    result = result + transpile_expression(node.operand, block);
 
     return result;
 
 def transpile_list(node: ast.List, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
-    result = result + "{";
+    # Join once instead of concatenating, data modules can hold tables with tens of thousands of elements
+    elements = [];
 
-    # Loop through the expressions
-    for i in range(0, len(node.elts)):
-        elt = node.elts[i];
-        result = result + transpile_expression(elt, block);
-        if i != len(node.elts) - 1:
-            result = result + ", ";
+    for elt in node.elts:
+        elements.append(transpile_expression(elt, block));
 
-    result = result + "}";
+    result = result + "{" + ", ".join(elements) + "}";
 
     return result;
 
+def transpile_tuple(node: ast.Tuple, block: CodeBlock) -> str:
+    result = initialise_string(node, block)
+
+    return result + "{" + ", ".join(transpile_expression(elt, block) for elt in node.elts) + "}";
+
 def transpile_lamba(node: ast.Lambda, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
+    lambda_block = block.add_child("lambda");
+
     # Header
-    result = result + "function (";
+    result = result + "function(";
 
     # Loop through the arguments
     for i in range(0, len(node.args.args)):
         arg = node.args.args[i];
-        result = result + arg.arg;
+        lambda_block.add_parameter(arg.arg);
+        result = result + lambda_block.get_name(arg.arg);
         if i != len(node.args.args) - 1:
             result = result + ", ";
 
     result = result + ")";
-    result = result + transpile_lines(node.body, block.add_child("lambda"));
+
+    # The body of a lambda is a single expression
+    result = result + " return " + transpile_expression(node.body, lambda_block) + " end";
 
     return result;
 
+def is_string(node: ast.expr, block: CodeBlock) -> bool:
+    # Whether node is known to be a str, which makes + a concatenation
+    if isinstance(node, ast.Constant): return isinstance(node.value, str);
+
+    if isinstance(node, ast.JoinedStr): return True;
+
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        return is_string(node.left, block) or is_string(node.right, block);
+
+    # text: str = ""
+    if isinstance(node, ast.Name): return block.get_variable_type(node.id) == "string";
+
+    return False;
+
+def is_concatenation(node: ast.BinOp | ast.AugAssign, block: CodeBlock) -> bool:
+    left = node.left if isinstance(node, ast.BinOp) else node.target;
+    right = node.right if isinstance(node, ast.BinOp) else node.value;
+
+    return isinstance(node.op, ast.Add) and (is_string(left, block) or is_string(right, block));
+
 def transpile_binop(node: ast.BinOp, block: CodeBlock) -> str:
     # BinOp(expr left, operator op, expr right)
     result = initialise_string(node, block)
-    
+
+    # a & b -> bit32.band(a, b)
+    if type(node.op) in bitwise_functions:
+        return result + bitwise_functions[type(node.op)] + "(" + transpile_expression(node.left, block) + ", " + transpile_expression(node.right, block) + ")";
+
     result = result + transpile_expression(node.left, block);
 
-    result = result + transpile_operator(node.op, block);
+    # Spaces keep "a - -b" from turning into a comment
+    result = result + " " + (".." if is_concatenation(node, block) else transpile_operator(node.op, block)) + " ";
 
     result = result + transpile_expression(node.right, block);
 
@@ -596,7 +1178,7 @@ def transpile_binop(node: ast.BinOp, block: CodeBlock) -> str:
 def transpile_yield(node: ast.Yield, block: CodeBlock):
     result = initialise_string(node, block)
 
-    block.add_variable("yield");
+    block.add_variable("yield", False);
 
     result = result + "yield[#yield+1] = " + transpile_expression(node.value, block);
 
@@ -629,20 +1211,57 @@ def transpile_delete(node: ast.Delete, block: CodeBlock):
 
     return result;
 
+def is_simple(node: ast.expr) -> bool:
+    # Evaluating these twice costs nothing and can't have side effects
+    return isinstance(node, (ast.Name, ast.Constant));
+
+def get_single_evaluation_target(node: ast.expr, block: CodeBlock) -> tuple[str, str]:
+    # Returns (target, declarations), where target can be read and written without evaluating anything in node twice:
+    # get_table()[f(x)] -> _ropy_t[_ropy_k], with "local _ropy_t, _ropy_k = get_table(), f(x);"
+    names = [];
+    values = [];
+
+    def hold(part: ast.expr, name: str) -> str:
+        if is_simple(part): return transpile_expression(part, block);
+
+        names.append(name);
+        values.append(transpile_expression(part, block));
+        return name;
+
+    if isinstance(node, ast.Attribute):
+        target = hold(node.value, "_ropy_t") + "." + node.attr;
+    elif isinstance(node, ast.Subscript):
+        target = hold(node.value, "_ropy_t");
+        target = target + "[" + hold(node.slice, "_ropy_k") + "]";
+    else:
+        target = transpile_expression(node, block);
+
+    if len(names) == 0: return (target, "");
+
+    return (target, "local " + ", ".join(names) + " = " + ", ".join(values) + ";");
+
 def transpile_augassign(node: ast.AugAssign, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
-    # x += 1
-    # x = x + 1
-    # target = target op value
+    # x += 1 and t[f(x)] += 1 as they are: Luau evaluates the target once, like Python
+    if is_concatenation(node, block):
+        return result + transpile_expression(node.target, block) + " ..= " + transpile_expression(node.value, block);
 
-    target = transpile_expression(node.target, block)
-    op = transpile_operator(node.op, block)
-    value = transpile_expression(node.value, block)
+    if type(node.op) in compound_operators:
+        return result + transpile_expression(node.target, block) + " " + transpile_operator(node.op, block) + "= " + transpile_expression(node.value, block);
 
-    result = target + " = " + target + " " + op + " " + value;
+    # Operators without a compound form (bit32 calls): target = bit32.band(target, value),
+    # with anything in the target that isn't a plain name or constant evaluated once into a temporary
+    target, declarations = get_single_evaluation_target(node.target, block);
 
-    return result;
+    if type(node.op) in bitwise_functions:
+        value = bitwise_functions[type(node.op)] + "(" + target + ", " + transpile_expression(node.value, block) + ")";
+    else:
+        value = target + " " + transpile_operator(node.op, block) + " " + transpile_expression(node.value, block);
+
+    if declarations == "": return result + target + " = " + value;
+
+    return result + "do " + declarations + " " + target + " = " + value + " end";
 
 def transpile_attribute(node: ast.Attribute, block: CodeBlock) -> str:
     result = initialise_string(node, block)
@@ -655,32 +1274,34 @@ def transpile_attribute(node: ast.Attribute, block: CodeBlock) -> str:
 def transpile_dict(node: ast.Dict, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
-    result = result + "{";
+    # Join once instead of concatenating, data modules can hold tables with tens of thousands of entries
+    entries = [];
 
     # Loop through the keys and values
     for i in range(0, len(node.keys)):
         key = node.keys[i];
         value = node.values[i];
-        result = result + transpile_expression(key);
-        result = result + " = ";
-        result = result + transpile_expression(value);
-        if i != len(node.keys) - 1:
-            result = result + ", ";
-    
-    result = result + "}";
+        entries.append("[" + transpile_expression(key, block) + "] = " + transpile_expression(value, block));
+
+    result = result + "{" + ", ".join(entries) + "}";
 
     return result;
 
 def transpile_name(node: ast.Name, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
-    result = result + node.id;
+    result = result + block.get_name(node.id);
 
     return result;
 
 def transpile_string(node: ast.Str, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
+    hoisted_strings = block.get_root().strings;
+
+    # Repeated strings in the "release" profile live in a module level local
+    if node.s in hoisted_strings: return result + hoisted_strings[node.s];
+
     result = result + "\"" + node.s + "\"";
 
     return result;
@@ -688,16 +1309,13 @@ def transpile_string(node: ast.Str, block: CodeBlock) -> str:
 def transpile_set(node: ast.Set, block: CodeBlock) -> str:
     result = initialise_string(node, block)
 
-    result = result + "{";
+    # Join once instead of concatenating, data modules can hold tables with tens of thousands of elements
+    elements = [];
 
-    # Loop through the expressions
-    for i in range(0, len(node.elts)):
-        elt = node.elts[i];
-        result = result + transpile_expression(elt, block);
-        if i != len(node.elts) - 1:
-            result = result + ", ";
+    for elt in node.elts:
+        elements.append(transpile_expression(elt, block));
 
-    result = result + "}";
+    result = result + "{" + ", ".join(elements) + "}";
 
     return result;
 
@@ -711,10 +1329,23 @@ def transpile_starred(node: ast.Starred, block: CodeBlock) -> str:
 
 # Selector function
 def transpile_expression(expression: ast.Expr | ast.expr, block: CodeBlock) -> str:
+    # Made once at the top of the module
+    constants = block.get_root().constants;
+
+    if len(constants) > 0 and id(expression) in constants:
+        return constants[id(expression)];
+
+    return transpile_value(expression, block);
+
+def transpile_value(expression: ast.Expr | ast.expr, block: CodeBlock) -> str:
     # BoolOp
     if isinstance(expression, ast.BoolOp):
         return transpile_boolop(expression, block);
 
+    # Await
+    if isinstance(expression, ast.Await):
+        return transpile_await(expression, block);
+
     # NamedExpr (probably needs to be a separate function)
     if isinstance(expression, ast.NamedExpr):
         return expression.name + " = " + transpile_expression(expression.value, block);
@@ -725,15 +1356,15 @@ def transpile_expression(expression: ast.Expr | ast.expr, block: CodeBlock) -> s
 
     # UnaryOp
     if isinstance(expression, ast.UnaryOp):
-        return transpile_unaryop(expression.op, block);
+        return transpile_unaryop(expression, block);
     
     # Lambda
     if isinstance(expression, ast.Lambda):
         return transpile_lamba(expression, block);
 
-    # IfExp (should be a separate function)
+    # IfExp
     if isinstance(expression, ast.IfExp):
-        return transpile_expression(expression.test, block) + " ? " + transpile_expression(expression.body, block) + " : " + transpile_expression(expression.orelse, block);
+        return transpile_ifexp(expression, block);
 
     # Dict (should be a separate function)
     if isinstance(expression, ast.Dict):
@@ -743,10 +1374,6 @@ def transpile_expression(expression: ast.Expr | ast.expr, block: CodeBlock) -> s
     if isinstance(expression, ast.Set):
         return transpile_set(expression, block);
 
-    # Await (what is the equivalent in lua?)
-    if isinstance(expression, ast.Await):
-        return transpile_expression(expression.value, block);
-
     # Yield (what is the equivalent in lua?)
     if isinstance(expression, ast.Yield):
         return transpile_yield(expression, block);
@@ -777,12 +1404,23 @@ def transpile_expression(expression: ast.Expr | ast.expr, block: CodeBlock) -> s
     
     # Call
     if isinstance(expression, ast.Call):
+        # Several return values only fit in one value as a table, "return None" stays nil
+        if is_tuple_call(expression, block): return "ropy.pack(" + transpile_call(expression, block) + ")";
+
         return transpile_call(expression, block);
 
+    # Tuple (stored as a table, see transpile_unpacking for the rest)
+    if isinstance(expression, ast.Tuple):
+        return transpile_tuple(expression, block);
+
     # Name
     if isinstance(expression, ast.Name):
         return transpile_name(expression, block);
 
+    # True, False and None
+    if isinstance(expression, ast.Constant) and (expression.value is None or isinstance(expression.value, bool)):
+        return { None: "nil", True: "true", False: "false" }[expression.value];
+
     # Num (should be a separate function)
     if isinstance(expression, ast.Num):
         return str(expression.n);
@@ -799,15 +1437,20 @@ def transpile_expression(expression: ast.Expr | ast.expr, block: CodeBlock) -> s
     if isinstance(expression, ast.Starred):
         return transpile_starred(expression, block);
 
-    print("Warning: unknown expression " + expression.__class__.__name__);
-    exit();
+    report("unsupported expression " + expression.__class__.__name__, expression, block);
+
+    return "nil";
 
 # Selector function
 def transpile_statement(statement: ast.stmt | list[ast.stmt], block: CodeBlock) -> str:
     # If the statement is a FunctionDef
-    if isinstance(statement, ast.FunctionDef):
+    if isinstance(statement, ast.FunctionDef) or isinstance(statement, ast.AsyncFunctionDef):
         return transpile_function(statement, block);
 
+    # Import
+    if isinstance(statement, ast.Import):
+        return transpile_import(statement, block);
+
     # If the statement is a If
     if isinstance(statement, ast.If):
         return transpile_if(statement, block);
@@ -828,6 +1471,10 @@ def transpile_statement(statement: ast.stmt | list[ast.stmt], block: CodeBlock)
     if isinstance(statement, ast.Assign):
         return transpile_assign(statement, block);
 
+    # AnnAssign
+    if isinstance(statement, ast.AnnAssign):
+        return transpile_annassign(statement, block);
+
     # AugAssign
     if isinstance(statement, ast.AugAssign):
         return transpile_augassign(statement, block);
@@ -838,10 +1485,14 @@ def transpile_statement(statement: ast.stmt | list[ast.stmt], block: CodeBlock)
 
     # Expr
     if isinstance(statement, ast.Expr):
+        # The result is dropped, so there's no need to pack it
+        if isinstance(statement.value, ast.Call): return transpile_call(statement.value, block);
+
         return transpile_expression(statement.value, block);
 
-    print("Warning: unknown statement " + statement.__class__.__name__)
-    exit();
+    report("unsupported statement " + statement.__class__.__name__, statement, block);
+
+    return "-- unsupported " + statement.__class__.__name__;
 
 # Selector function
 def transpile_operator(operator: ast.operator, block: CodeBlock) -> str:
@@ -860,14 +1511,18 @@ def transpile_operator(operator: ast.operator, block: CodeBlock) -> str:
     if isinstance(operator, ast.Div):
         return result + "/";
 
+    if isinstance(operator, ast.FloorDiv):
+        return result + "//";
+
     if isinstance(operator, ast.Mod):
         return result + "%";
 
     if isinstance(operator, ast.Pow):
         return result + "^";
     
-    print("Warning: Unknown operator " + operator.__class__.__name__);
-    exit();
+    report("unsupported operator " + operator.__class__.__name__, operator, block);
+
+    return result + "--[[ unsupported " + operator.__class__.__name__ + " ]]";
 
 def transpile_statements(statements: list[ast.stmt], block: CodeBlock) -> str:
     result = "";
@@ -890,6 +1545,11 @@ def transpile_line(node: ast.Expr | ast.expr | ast.stmt, block: CodeBlock) -> st
     # Check if statement or expression
     result = "";
 
+    root = block.get_root();
+    outer_statement = root.statement;
+
+    if hasattr(node, "lineno"): root.statement = node;
+
     if isinstance(node, ast.Expr) or isinstance(node, ast.expr):
         result = transpile_expression(node, block);
 
@@ -900,12 +1560,13 @@ def transpile_line(node: ast.Expr | ast.expr | ast.stmt, block: CodeBlock) -> st
         result = transpile_operator(node, block);
 
     if result == "":
-        print("Warning: unknown node " + node.__class__.__name__ + " which inherits from " + node.__class__.__bases__[0].__name__);
-        exit();
+        report("unsupported " + node.__class__.__bases__[0].__name__ + " " + node.__class__.__name__, node, block);
+
+    root.statement = outer_statement;
     
     return (
-        block.get_offset() + result + 
-        ( (" -- Line " + str(node.lineno) + "\n") if toggle_line_of_code else "\n" )
+        sourcemap_util.get_line_mark(node) + block.get_offset() + result + 
+        ( (" -- Line " + str(node.lineno) + "\n") if toggle_line_of_code and not block.get_root().release else "\n" )
     );
 
 def transpile_lines(node: list[ast.expr | ast.Expr | ast.stmt | ast.operator], block: CodeBlock) -> str:
@@ -920,12 +1581,146 @@ def transpile_lines(node: list[ast.expr | ast.Expr | ast.stmt | ast.operator], b
 
     return result;
 
-def transpile_module(module: ast.Module) -> str:
-    global top_block
-    result = 'local ropy = require(game:FindFirstChild("ropy", true))\n\n';
-    result = result + transpile_lines(module.body, top_block);
+def get_tuple_functions(module: ast.Module) -> set[str]:
+    # Module level functions that return tuples, which become functions returning several values.
+    # A function returning what one of those returns is one too.
+    # Functions used as values (sorted(xs, key=split), f = split, ...) are called by code that expects one value
+    called: set[int] = set();
+    used_as_values: set[str] = set();
+
+    for node in ast.walk(module):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name): called.add(id(node.func));
+
+    for node in ast.walk(module):
+        if isinstance(node, ast.Name) and id(node) not in called: used_as_values.add(node.id);
+
+    functions = {
+        statement.name: statement for statement in module.body
+        if isinstance(statement, ast.FunctionDef) and statement.name not in used_as_values
+    };
+    tuple_functions: set[str] = set();
+
+    def returns_tuple(function: ast.FunctionDef) -> bool:
+        if function.returns is not None and annotations_util.is_tuple_annotation(function.returns): return True;
+
+        for node in truthiness_util.iterate_scope(function.body):
+            if not isinstance(node, ast.Return): continue;
+
+            if isinstance(node.value, ast.Tuple): return True;
+
+            if isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Name) and node.value.func.id in tuple_functions:
+                return True;
+
+        return False;
+
+    changed = True;
 
-    # Reset top block
+    while changed:
+        changed = False;
+
+        for name in functions:
+            if name not in tuple_functions and returns_tuple(functions[name]):
+                tuple_functions.add(name);
+                changed = True;
+
+    return tuple_functions;
+
+def create_top_block(
+    module: ast.Module, profile: str, diagnostics: diagnostics_util.Diagnostics | None = None, builtins: dict | None = None,
+    check: bool = False
+) -> CodeBlock:
+    # Every module gets its own top block so several modules can be transpiled at once (see daemon.py)
     top_block = CodeBlock("0", "module", [], []);
+    top_block.node = module;
+    top_block.diagnostics = diagnostics or diagnostics_util.Diagnostics();
+    top_block.builtins = builtins_util.get_index(builtin_functions, builtin_attribute_functions, special_functions, builtins);
+    top_block.tuple_functions = get_tuple_functions(module);
+
+    if profile == "release":
+        top_block.release = True;
+        top_block.short_names = minify_util.ShortNames(minify_util.get_module_names(module));
+        top_block.strings = minify_util.get_hoisted_strings(module, top_block.short_names);
+
+    # Hoisting only changes where values are built, checks can do without it
+    if not check:
+        top_block.constants, top_block.constant_values = hoisting_util.get_loop_constants(module, top_block.short_names);
+
+    return top_block;
+
+def get_directive_lines(directives: list[str]) -> str:
+    # ["strict", "native"] -> --!strict and --!native, which Luau only reads at the very top of a script
+    result = "";
+
+    for directive in directives:
+        result = result + "--!" + directive + "\n";
+
+    return result;
+
+def transpile_module_chunks(
+    module: ast.Module, source_map: sourcemap_util.SourceMap | None = None, profile: str = "dev", directives: list[str] = [],
+    diagnostics: diagnostics_util.Diagnostics | None = None, builtins: dict | None = None, check: bool = False
+):
+    # Yields the module one top level statement at a time, so it can be written out while it's being transpiled.
+    # The first chunk holds the directives (if any), the second one is always the ropy require.
+    # Problems end up in diagnostics, the output is only usable if it has no errors.
+    # With check, only what diagnostics need is done: no hoisting, no minifying and no source map
+    top_block = create_top_block(module, "dev" if check else profile, diagnostics, builtins, check);
+    line = 0;
+
+    def finish(text: str, squeeze: bool = True) -> str:
+        nonlocal line
+
+        if check: return "";
+
+        if top_block.release and squeeze:
+            text = minify_util.squeeze_whitespace(text);
+
+        text = sourcemap_util.finish_module(text, source_map, line);
+        line = line + text.count("\n");
+
+        return text;
+
+    try:
+        # Directives look like comments, so they must survive squeeze_whitespace
+        yield finish(get_directive_lines(directives), False);
+
+        yield finish('local ropy = require(game:FindFirstChild("ropy", true))\n\n');
+
+        strings = "";
+
+        for value in top_block.strings:
+            strings = strings + "local " + top_block.strings[value] + " = \"" + value + "\"\n";
+
+        yield finish(strings);
+
+        constants = "";
+
+        for name in top_block.constant_values:
+            constants = constants + "local " + name + " = " + transpile_value(top_block.constant_values[name], top_block) + "\n";
+
+        yield finish(constants + ("\n" if constants != "" else ""));
+
+        for statement in module.body:
+            try:
+                text = transpile_line(statement, top_block);
+            except Exception as e:
+                # A bug in the transpiler, still only costs this statement
+                report("internal error while transpiling " + statement.__class__.__name__ + ": " + repr(e), statement, top_block);
+                text = "";
+
+            yield finish(text);
+    finally:
+        top_block.dispose();
+
+def transpile_module(
+    module: ast.Module, source_map: sourcemap_util.SourceMap | None = None, profile: str = "dev", directives: list[str] = [],
+    diagnostics: diagnostics_util.Diagnostics | None = None, builtins: dict | None = None
+) -> str:
+    chunks = list(transpile_module_chunks(module, source_map, profile, directives, diagnostics, builtins));
+
+    # Scripts that never touch the runtime don't need to wait for it in the "release" profile
+    if profile == "release" and not any("ropy." in chunk for chunk in chunks[2:]):
+        if source_map is not None: source_map.shift_lines(-chunks[1].count("\n"));
+        chunks = chunks[:1] + chunks[2:];
 
-    return result
\ No newline at end of file
+    return "".join(chunks)
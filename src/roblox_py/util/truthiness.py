@@ -0,0 +1,141 @@
+import ast
+
+# Python and Luau disagree on what is falsy: Python also treats 0, "" and empty containers as false.
+# Conditions that are known to be booleans (comparisons, "not", bool variables, ...) can be emitted as they are,
+# everything else needs a runtime check, see transpile_condition in transpilation.py
+
+# Functions whose result is always a bool once transpiled
+boolean_functions = ["all"];
+
+# Nodes with a scope of their own
+nested_scopes = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp);
+
+def iterate_scope(nodes: list[ast.AST]):
+    # Every node in a scope, without descending into nested scopes
+    stack = list(reversed(nodes));
+
+    while len(stack) > 0:
+        node = stack.pop();
+
+        # Their names (and defaults) still live in this scope, but nothing inside them does.
+        # Checked when popped, so a def that is itself one of the nodes (a statement of the body) is skipped too
+        if isinstance(node, nested_scopes):
+            if hasattr(node, "name"): yield node;
+            continue;
+
+        yield node;
+
+        for child in ast.iter_child_nodes(node):
+            stack.append(child);
+
+def is_bool_annotation(annotation: ast.expr | None) -> bool:
+    return isinstance(annotation, ast.Name) and annotation.id == "bool";
+
+def get_scope_booleans(scope: ast.Module | ast.FunctionDef) -> tuple[set[str], set[str]]:
+    # Returns (every name assigned in the scope, the names that only ever hold a bool)
+    # name -> every value assigned to it, None standing for "could be anything"
+    values: dict[str, list[ast.expr | None]] = {};
+
+    def add(name: str, value: ast.expr | None):
+        values.setdefault(name, []).append(value);
+
+    def add_target(target: ast.expr, value: ast.expr | None):
+        if isinstance(target, ast.Name):
+            add(target.id, value);
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            for element in target.elts:
+                add_target(element, None);
+        elif isinstance(target, ast.Starred):
+            add_target(target.value, None);
+
+    if isinstance(scope, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        arguments = scope.args;
+
+        for arg in arguments.posonlyargs + arguments.args + arguments.kwonlyargs + [arguments.vararg, arguments.kwarg]:
+            if arg is None: continue;
+            # Callers can pass anything, unless we're told otherwise
+            add(arg.arg, ast.Constant(True) if is_bool_annotation(arg.annotation) else None);
+
+    for node in iterate_scope(scope.body):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                add_target(target, node.value);
+        elif isinstance(node, ast.AnnAssign):
+            if is_bool_annotation(node.annotation):
+                add_target(node.target, ast.Constant(True));
+            elif node.value is not None:
+                add_target(node.target, node.value);
+        elif isinstance(node, ast.NamedExpr):
+            add_target(node.target, node.value);
+        elif isinstance(node, (ast.AugAssign, ast.For, ast.AsyncFor)):
+            add_target(node.target, None);
+        elif isinstance(node, ast.withitem) and node.optional_vars is not None:
+            add_target(node.optional_vars, None);
+        elif isinstance(node, ast.ExceptHandler) and node.name is not None:
+            add(node.name, None);
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            for name in node.names:
+                add(name, None);
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                add((alias.asname or alias.name).split(".")[0], None);
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            add(node.name, None);
+
+    # Grow the set of booleans until nothing changes, so "a = b > 0; c = a" finds both
+    booleans = set();
+    is_name_boolean = lambda other: other in booleans;
+    changed = True;
+
+    while changed:
+        changed = False;
+
+        for name in values:
+            if name in booleans: continue;
+
+            if all(value is not None and is_boolean(value, is_name_boolean) for value in values[name]):
+                booleans.add(name);
+                changed = True;
+
+    return (set(values), booleans);
+
+def is_boolean(node: ast.expr, is_boolean_name) -> bool:
+    # Whether node always evaluates to true, false or nil, so Luau reads it the same way Python does
+    if isinstance(node, ast.Compare): return True;
+
+    if isinstance(node, ast.Constant):
+        return node.value is None or isinstance(node.value, bool);
+
+    if isinstance(node, ast.UnaryOp): return isinstance(node.op, ast.Not);
+
+    if isinstance(node, ast.BoolOp):
+        return all(is_boolean(value, is_boolean_name) for value in node.values);
+
+    if isinstance(node, ast.IfExp):
+        return is_boolean(node.body, is_boolean_name) and is_boolean(node.orelse, is_boolean_name);
+
+    if isinstance(node, ast.Call):
+        return isinstance(node.func, ast.Name) and node.func.id in boolean_functions;
+
+    if isinstance(node, ast.Name): return is_boolean_name(node.id);
+
+    return False;
+
+def is_plain_read(node: ast.expr) -> bool:
+    # Whether node can be evaluated twice without doing anything twice: x, self.health, items[1], ...
+    if isinstance(node, (ast.Name, ast.Constant)): return True;
+
+    if isinstance(node, ast.Attribute): return is_plain_read(node.value);
+
+    if isinstance(node, ast.Subscript):
+        return is_plain_read(node.value) and not isinstance(node.slice, ast.Slice) and is_plain_read(node.slice);
+
+    return False;
+
+def get_constant_truthiness(node: ast.expr) -> bool | None:
+    # Constants can be decided right away, "while 1:" is "while true do"
+    if not isinstance(node, ast.Constant): return None;
+
+    if isinstance(node.value, (int, float, str, bytes)): return bool(node.value);
+
+    return None;
@@ -0,0 +1,20 @@
+from roblox_py.transpiler import transpiler
+
+def transpile(source: str) -> str:
+    transpilation = transpiler.transpile_source(source, { "profile": "dev" });
+    assert transpilation["error"] is None, transpilation["error"];
+    return transpilation["result"];
+
+def test_functions_returning_none_return_nothing():
+    result = transpile("def f(x: int) -> None:\n    if x:\n        return None\n    return\n");
+
+    assert "function f(x: number): ()" in result;
+    assert "return nil" not in result;
+
+def test_optional_return_types_keep_nil():
+    assert "return nil" in transpile("def f() -> int | None:\n    return None\n");
+
+def test_none_defaults_make_parameters_optional():
+    result = transpile("def f(x: int, y: int = None, z: str = \"a\"):\n    return x\n");
+
+    assert "function f(x: number, y: number?, z: string)" in result;
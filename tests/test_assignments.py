@@ -0,0 +1,30 @@
+from roblox_py.transpiler import transpiler
+
+def transpile(source: str) -> str:
+    transpilation = transpiler.transpile_source(source, { "profile": "dev" });
+    assert transpilation["error"] is None, transpilation["error"];
+    return transpilation["result"];
+
+def in_function(*lines: str) -> str:
+    return transpile("def f(t, x, s):\n" + "".join("    " + line + "\n" for line in lines));
+
+def test_arithmetic_uses_compound_assignment():
+    # Luau evaluates the target of a compound assignment once, like Python
+    assert "t[f(x)] += 1" in in_function("t[f(x)] += 1");
+    assert "x //= 2" in in_function("x //= 2");
+
+def test_string_concatenation_uses_concatenation_assignment():
+    assert "s ..= \"a\"" in in_function("s += \"a\"");
+
+def test_bitwise_operators_evaluate_the_target_once():
+    result = in_function("t[f(x)] &= 3", "g().n |= 4");
+
+    assert "do local _ropy_k = f(x); t[_ropy_k] = bit32.band(t[_ropy_k], 3) end" in result;
+    assert "do local _ropy_t = g(); _ropy_t.n = bit32.bor(_ropy_t.n, 4) end" in result;
+    assert result.count("f(x)") == 1;
+
+def test_bitwise_operators_on_names_need_no_locals():
+    result = in_function("x <<= 2");
+
+    assert "x = bit32.lshift(x, 2)" in result;
+    assert "do local" not in result;
@@ -0,0 +1,41 @@
+from roblox_py.transpiler import transpiler
+
+def transpile(source: str) -> str:
+    transpilation = transpiler.transpile_source(source, { "profile": "dev" });
+    assert transpilation["error"] is None, transpilation["error"];
+    return transpilation["result"];
+
+def test_builtin_calls_use_the_runtime():
+    result = transpile("total = sum([1, 2])\n");
+
+    assert "ropy.sum({1, 2})" in result;
+
+def test_functions_of_the_module_shadow_builtins():
+    result = transpile(
+        "def filter(items):\n"
+        "    return items\n"
+        "def max(a):\n"
+        "    return a\n"
+        "kept = filter([1])\n"
+        "biggest = max(3)\n"
+    );
+
+    assert "filter({1})" in result and "ropy.filter" not in result;
+    assert "max(3)" in result and "ropy.max" not in result;
+
+def test_parameters_shadow_builtins():
+    result = transpile(
+        "def apply(map, x):\n"
+        "    return map(x)\n"
+    );
+
+    assert "return map(x)" in result;
+
+def test_module_names_shadow_mapped_modules():
+    settings = { "profile": "dev", "builtins": { "http.get": "game:GetService(\"HttpService\"):GetAsync" } };
+
+    mapped = transpiler.transpile_source("page = http.get(url)\n", settings)["result"];
+    shadowed = transpiler.transpile_source("http = make_client()\npage = http.get(url)\n", settings)["result"];
+
+    assert "GetAsync(url)" in mapped;
+    assert "GetAsync" not in shadowed;
@@ -0,0 +1,14 @@
+from roblox_py.transpiler import transpiler
+
+def test_check_reports_what_a_build_reports():
+    source = "x = 1\nclass Player:\n    pass\nwhile True:\n    y = (1, 2)\n";
+    check = transpiler.check_source(source, { "profile": "release" }, "a.py");
+    build = transpiler.transpile_source(source, { "profile": "release" }, "a.py");
+
+    assert check["error"] == build["error"];
+    assert check["diagnostics"] == build["diagnostics"];
+
+def test_check_passes_valid_sources():
+    check = transpiler.check_source("while True:\n    y = (1, 2)\n");
+
+    assert check["error"] is None;
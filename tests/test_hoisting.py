@@ -0,0 +1,62 @@
+from roblox_py.transpiler import transpiler
+
+def transpile(source: str) -> str:
+    transpilation = transpiler.transpile_source(source, { "profile": "dev" });
+    assert transpilation["error"] is None, transpilation["error"];
+    return transpilation["result"];
+
+def in_loop(*lines: str) -> str:
+    return transpile("while True:\n" + "".join("    " + line + "\n" for line in lines));
+
+def test_membership_tests_are_hoisted():
+    result = in_loop("if state in (\"idle\", \"walk\"):", "    x = 1");
+
+    assert "local _ropy_c1 = {\"idle\", \"walk\"}" in result;
+    assert "ropy.operator_in(state, _ropy_c1)" in result;
+
+def test_read_only_dicts_are_hoisted():
+    result = in_loop("weights = {\"a\": 1}", "y = weights[k]", "z = {\"b\": 2}[k]");
+
+    assert "local _ropy_c1 = {[\"a\"] = 1}" in result;
+    assert "weights = _ropy_c1" in result;
+    assert "z = _ropy_c2[k]" in result;
+
+def test_constant_roblox_values_are_hoisted():
+    result = in_loop("part.Velocity = Vector3.new(0, 10, 0)", "r = math.sqrt(2)");
+
+    assert "local _ropy_c1 = Vector3.new(0, 10, 0)" in result;
+    assert "part.Velocity = _ropy_c1" in result;
+    assert "r = _ropy_c2" in result;
+
+def test_changed_tables_stay_in_the_loop():
+    result = in_loop("x = []", "x.append(1)", "t = {\"a\": 1}", "t[k] = v");
+
+    assert "_ropy_c" not in result;
+    assert "x = {}" in result;
+    assert "t = {[\"a\"] = 1}" in result;
+
+def test_returned_and_aliased_tables_stay_in_the_function():
+    result = transpile(
+        "def f():\n"
+        "    while True:\n"
+        "        r = (1, 2)\n"
+        "        a = (3, 4)\n"
+        "        b = a\n"
+        "        return r\n"
+    );
+
+    assert "_ropy_c" not in result;
+
+def test_nested_mutable_literals_stay_in_the_loop():
+    assert "_ropy_c" not in in_loop("for d in ((1, 2), [3]):", "    x = d");
+
+def test_shadowed_globals_are_not_hoisted():
+    result = transpile(
+        "Vector3 = make_vector_type()\n"
+        "math = load_math()\n"
+        "while True:\n"
+        "    v = Vector3.new(0, 1, 0)\n"
+        "    r = math.sqrt(2)\n"
+    );
+
+    assert "_ropy_c" not in result;
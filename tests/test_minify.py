@@ -0,0 +1,33 @@
+import ast
+
+from roblox_py.transpiler import transpiler
+from roblox_py.util import minify
+
+def test_double_minus_is_not_a_comment():
+    assert minify.squeeze_whitespace("local x = a - -b\n") == "local x=a- -b\n";
+
+def test_concatenation_keeps_its_spaces():
+    assert minify.squeeze_whitespace("local s = a .. b .. 1 .. c\n") == "local s=a .. b .. 1 .. c\n";
+
+def test_comment_markers_in_strings_survive():
+    assert minify.squeeze_whitespace("local s = \"a -- b\" -- comment\n") == "local s=\"a -- b\"\n";
+    assert minify.squeeze_whitespace("local s = 'a --[[ b ]]'\n") == "local s='a --[[ b ]]'\n";
+
+def test_line_marks_survive():
+    text = "\0003:0\000local x = 1\n\0004:0\000\n\0005:4\000  return x\n";
+
+    assert minify.squeeze_whitespace(text) == "\0003:0\000local x=1\n\0005:4\000return x\n";
+
+def test_short_names_skip_reserved_names():
+    names = minify.ShortNames(minify.get_module_names(ast.parse("a = 1\ndef b(c):\n    return c\n")));
+    given = [names.get_next() for _ in range(3000)];
+
+    assert len(set(given)) == len(given);
+    assert not any(name in ("a", "b", "c") for name in given);
+    assert not any(name in minify.luau_keywords or name in minify.emitted_names for name in given);
+
+def test_help_strings_work_in_release():
+    transpilation = transpiler.transpile_source("def greet(name):\n    \"Says hi\"\n    return name\n", { "profile": "release" });
+
+    assert transpilation["error"] is None, transpilation["error"];
+    assert "if _ropy_help==\"help\"then return\"Says hi\"end" in transpilation["result"];
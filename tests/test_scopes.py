@@ -0,0 +1,85 @@
+import ast
+
+from roblox_py.transpiler import transpiler
+from roblox_py.util import truthiness
+
+def transpile(source: str) -> str:
+    transpilation = transpiler.transpile_source(source, { "profile": "dev" });
+    assert transpilation["error"] is None, transpilation["error"];
+    return transpilation["result"];
+
+def test_nested_def_returning_a_tuple_leaves_the_outer_function_alone():
+    result = transpile(
+        "def outer(t):\n"
+        "    def inner():\n"
+        "        return 1, 2\n"
+        "    return t\n"
+    );
+
+    assert "table.unpack" not in result;
+    assert "return t" in result;
+
+def test_nested_def_assignments_stay_in_their_scope():
+    module = ast.parse(
+        "ready = True\n"
+        "def f():\n"
+        "    ready = 0\n"
+    );
+
+    assigned, booleans = truthiness.get_scope_booleans(module);
+
+    assert "ready" in booleans;
+    assert "f" in assigned;
+
+def test_unpacking_unknown_calls_goes_through_table_unpack():
+    result = transpile("x, y = get()\n");
+
+    assert "x, y = table.unpack(get(), 1, 2)" in result;
+
+def test_tuple_function_results_keep_none():
+    result = transpile(
+        "def get_pos(p):\n"
+        "    if p is None:\n"
+        "        return None\n"
+        "    return p, p\n"
+        "x, y = get_pos(1)\n"
+        "pos = get_pos(None)\n"
+    );
+
+    assert "local x, y = get_pos(1)" in result;
+    assert "local pos = ropy.pack(get_pos(nil))" in result;
+    assert "return nil" in result;
+
+def test_nested_functions_return_tuples_as_tables():
+    result = transpile(
+        "def outer():\n"
+        "    def inner():\n"
+        "        return 1, 2\n"
+        "    x = inner()\n"
+        "    return x\n"
+    );
+
+    assert "return {1, 2}" in result;
+    assert "local x = inner()" in result;
+
+def test_tuple_functions_used_as_values_return_tables():
+    result = transpile(
+        "def split(v):\n"
+        "    return v, v\n"
+        "ys = sorted(xs, key=split)\n"
+        "a, b = split(1)\n"
+    );
+
+    assert "return {v, v}" in result;
+    assert "local a, b = table.unpack(split(1), 1, 2)" in result;
+
+def test_async_functions_return_tuples_as_tables():
+    result = transpile(
+        "async def pair():\n"
+        "    return 1, 2\n"
+        "async def main():\n"
+        "    a, b = await pair()\n"
+    );
+
+    assert "return {1, 2}" in result;
+    assert "local a, b = table.unpack(ropy.await(pair()), 1, 2)" in result;
@@ -0,0 +1,36 @@
+import pytest
+
+from roblox_py.transpiler import transpiler
+from roblox_py.util import sourcemap
+
+source = "x = 1\ny = x + 1\nif y:\n    z = 2\n";
+
+def test_encode_vlq():
+    assert sourcemap.encode_vlq(0) == "A";
+    assert sourcemap.encode_vlq(1) == "C";
+    assert sourcemap.encode_vlq(-1) == "D";
+    assert sourcemap.encode_vlq(15) == "e";
+    assert sourcemap.encode_vlq(16) == "gB";
+    assert sourcemap.encode_vlq(-16) == "hB";
+
+@pytest.mark.parametrize("profile, statements, mappings", [
+    ("dev", ["local x = 1", "local y = x + 1", "if ", "z = 2"], ";;AAAA;AACA;AACA;AACI"),
+    ("release", ["local a=1", "local b=a+1", "if(", "c=2"], ";AAAA;AACA;AACA;AACI"),
+])
+def test_generated_lines_map_to_their_statements(profile, statements, mappings):
+    transpilation = transpiler.transpile_source(source, { "profile": profile, "sourceMaps": True });
+    assert transpilation["error"] is None, transpilation["error"];
+
+    lines = transpilation["result"].split("\n");
+    source_map = transpilation["source_map"];
+
+    # Every Python statement, in order: (source line, source column) -> the generated line that starts it
+    positions = [(0, 0), (1, 0), (2, 0), (3, 4)];
+    mapped = { source_map.lines[generated_line]: generated_line for generated_line in source_map.lines };
+
+    assert sorted(mapped) == positions;
+
+    for i in range(len(positions)):
+        assert lines[mapped[positions[i]]].strip().startswith(statements[i]);
+
+    assert source_map.get_mappings() == mappings;
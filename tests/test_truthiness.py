@@ -0,0 +1,43 @@
+from roblox_py.transpiler import transpiler
+
+def transpile(source: str) -> str:
+    transpilation = transpiler.transpile_source(source, { "profile": "dev" });
+    assert transpilation["error"] is None, transpilation["error"];
+    return transpilation["result"];
+
+def test_attributes_use_python_truthiness():
+    result = transpile("def f(self):\n    return self.health or 100\n");
+
+    assert "(if ropy.truthy(self.health) then self.health else 100)" in result;
+
+def test_calls_are_evaluated_once():
+    result = transpile("def f():\n    return get_count() or 5\n");
+
+    assert result.count("get_count()") == 1;
+    assert "if ropy.truthy(_ropy_v) then return _ropy_v end return 5" in result;
+
+def test_and_returns_the_falsy_operand():
+    result = transpile("def f():\n    return get_count() and 5\n");
+
+    assert "if not ropy.truthy(_ropy_v) then return _ropy_v end return 5" in result;
+
+def test_constants_are_decided_right_away():
+    assert "return fallback" in transpile("def f():\n    return 0 or fallback\n");
+    assert "return 1\n" in transpile("def f():\n    return 1 or fallback\n");
+
+def test_unimplemented_builtins_are_not_booleans():
+    result = transpile("def f(x, y):\n    return isinstance(x, int) or y\n");
+
+    assert "ropy.truthy(_ropy_v)" in result;
+
+def test_comprehension_targets_hide_boolean_names():
+    result = transpile("v = True\nys = [v for v in xs if v]\n");
+
+    assert "if v then" not in result;
+    assert "ropy.truthy(v)" in result;
+
+def test_lambda_parameters_hide_boolean_names():
+    result = transpile("v = True\nf = lambda v: 1 if v else 2\ng = lambda w: 1 if v else 2\n");
+
+    assert "function(v) return (if (v and v ~= 0" in result;
+    assert "function(w) return (if v then 1 else 2)" in result;